@@ -1,165 +1,456 @@
-import copy
 import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from game_logic import (
+    ADJACENCY_MASKS, CELL_POSITIONS, FULL_MASK, LINE_MASKS,
+    START_ROW_MASKS, WINNING_MASKS, SearchTimeout, board_to_masks, count_mask_moves, get_mask_moves,
+)
+from batch_eval import lookup, mask_matrix, np, score_table
+from search_stats import SearchStats
+from symmetry import CELL_PERMUTATIONS, MASK_PERMUTATIONS, MIRROR
+from transposition import (
+    EXACT, LOWER_BOUND, UPPER_BOUND, MIRROR_ZOBRIST_KEYS, SIDE_KEY, ZOBRIST_KEYS, TranspositionTable,
+    zobrist_key_masks,
+)
+
+# Number of complete lines contained in a mask
+LINE_COUNTS = tuple(
+    sum(1 for line in LINE_MASKS if mask & line == line) for mask in range(FULL_MASK + 1)
+)
+
+CENTER_BIT = 1 << 4
+
+MIRROR_CELLS = CELL_PERMUTATIONS[MIRROR]
+MIRROR_MASKS = MASK_PERMUTATIONS[MIRROR]
+
+# Deepest iteration of a time-limited search
+MAX_ITERATIVE_DEPTH = 32
+
+# Engine of each worker process of a parallel search, created by _init_worker
+_worker_ai = None
+
+
+def _init_worker(tt_size):
+    """Create the engine of a worker process; its table lives as long as the process."""
+    global _worker_ai
+    _worker_ai = ThreeMensMorrisAI(tt_size=tt_size)
+
+
+def _score_root_move(own_mask, opponent_mask, player, keys, move, depth, alpha, time_budget):
+    """Score one root move in a worker process. Returns (value, nodes, cutoffs)."""
+    ai = _worker_ai
+    ai.stats = SearchStats('minimax', ai.difficulty)
+    ai.deadline = None if time_budget is None else time.perf_counter() + time_budget
+    try:
+        value = ai.score_root_move(own_mask, opponent_mask, player, keys, move, depth, alpha)
+    finally:
+        ai.deadline = None
+    return value, ai.stats.nodes, ai.stats.cutoffs
+
+
+def evaluate_boards(boards, player):
+    """Vectorized evaluate_position over an (N, 9) array of boards."""
+    own = (boards == player).astype(np.int32)
+    opponent = (boards == 3 - player).astype(np.int32)
+    empty = (boards == 0).astype(np.int32)
+    line_matrix = mask_matrix(LINE_MASKS)
+    adjacency_matrix = mask_matrix(ADJACENCY_MASKS)
+
+    # Winning formations
+    lines = (own @ line_matrix == 3).sum(axis=1) - (opponent @ line_matrix == 3).sum(axis=1)
+    score = lines.astype(np.int64) * 100
+    # Center control (a cell has at most one owner)
+    score += (own[:, 4] - opponent[:, 4]) * 10
+    # Mobility: legal moves of each side into empty cells
+    score += (((own - opponent) @ adjacency_matrix) * empty).sum(axis=1) * 5
+    return score
+
 
 class ThreeMensMorrisAI:
-    def __init__(self, difficulty='medium'):
+    def __init__(self, difficulty='medium', tt_size=1 << 16, time_limit=None, workers=None):
         self.difficulty = difficulty
         self.max_depth = {
             'easy': 2,
             'medium': 3,
-            'hard': 4
+            'hard': 4,
+            'expert': 6
         }.get(difficulty, 3)
+        # Kept between moves: positions recur across consecutive searches
+        self.transposition_table = TranspositionTable(tt_size)
+        # Wall-clock budget per move in seconds; None searches max_depth
+        self.time_limit = time_limit
+        self.deadline = None
+        # Statistics of the last search
+        self.stats = SearchStats('minimax', difficulty)
+        # Worker processes scoring root moves in parallel; None or 1 searches serially
+        self.workers = workers
+        self.executor = None
+        self.reset_move_ordering()
+
+    def close(self):
+        """Shut down the worker processes of parallel searches."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
 
     def evaluate_position(self, board, player):
         """
         Evaluate the current board position for the given player.
         Returns a score where higher is better for the player.
         """
-        score = 0
-        opponent = 3 - player  # 1 -> 2, 2 -> 1
-
-        # Check for winning formations
-        for row in range(3):
-            # Horizontal
-            if board[row][0] == board[row][1] == board[row][2] == player:
-                score += 100
-            elif board[row][0] == board[row][1] == board[row][2] == opponent:
-                score -= 100
-
-        for col in range(3):
-            # Vertical
-            if board[0][col] == board[1][col] == board[2][col] == player:
-                score += 100
-            elif board[0][col] == board[1][col] == board[2][col] == opponent:
-                score -= 100
-
-        # Diagonals
-        if board[0][0] == board[1][1] == board[2][2] == player:
-            score += 100
-        elif board[0][0] == board[1][1] == board[2][2] == opponent:
-            score -= 100
-
-        if board[0][2] == board[1][1] == board[2][0] == player:
-            score += 100
-        elif board[0][2] == board[1][1] == board[2][0] == opponent:
-            score -= 100
+        player1_mask, player2_mask = board_to_masks(board)
+        if player == 1:
+            return self.evaluate_masks(player1_mask, player2_mask)
+        return self.evaluate_masks(player2_mask, player1_mask)
+
+    def evaluate_masks(self, own_mask, opponent_mask):
+        """Evaluate a position given as bitboards of the player and the opponent."""
+        # Winning formations
+        score = (LINE_COUNTS[own_mask] - LINE_COUNTS[opponent_mask]) * 100
 
         # Center control
-        if board[1][1] == player:
+        if own_mask & CENTER_BIT:
             score += 10
-        elif board[1][1] == opponent:
+        elif opponent_mask & CENTER_BIT:
             score -= 10
 
         # Mobility (number of valid moves)
-        player_moves = self.count_valid_moves(board, player)
-        opponent_moves = self.count_valid_moves(board, opponent)
+        occupied = own_mask | opponent_mask
+        player_moves = len(get_mask_moves(own_mask, occupied))
+        opponent_moves = len(get_mask_moves(opponent_mask, occupied))
         score += (player_moves - opponent_moves) * 5
 
         return score
 
+    def evaluate_batch(self, boards, player):
+        """
+        Evaluate an (N, 9) integer array of boards for player (1, 2 or an (N,)
+        array of them). Returns an (N,) array equal to evaluate_position on
+        every board; requires numpy.
+        """
+        return lookup(score_table('ThreeMensMorrisAI.evaluate_position', evaluate_boards), boards, player)
+
     def count_valid_moves(self, board, player):
         """Count the number of valid moves available for a player."""
-        count = 0
-        for row in range(3):
-            for col in range(3):
-                if board[row][col] == player:
-                    # Check all possible moves from this position
-                    for dr in [-1, 0, 1]:
-                        for dc in [-1, 0, 1]:
-                            if dr == 0 and dc == 0:
-                                continue
-                            new_row, new_col = row + dr, col + dc
-                            if (0 <= new_row < 3 and 0 <= new_col < 3 and 
-                                board[new_row][new_col] == 0):
-                                count += 1
-        return count
+        player1_mask, player2_mask = board_to_masks(board)
+        own_mask = player1_mask if player == 1 else player2_mask
+        return self.count_mask_moves(own_mask, FULL_MASK & ~(player1_mask | player2_mask))
+
+    def count_mask_moves(self, own_mask, empty_mask):
+        """Count the valid moves from own_mask to empty cells."""
+        return count_mask_moves(own_mask, FULL_MASK & ~empty_mask)
 
     def get_valid_moves(self, board, player):
         """Get all valid moves for a player."""
-        valid_moves = []
-        for row in range(3):
-            for col in range(3):
-                if board[row][col] == player:
-                    for dr in [-1, 0, 1]:
-                        for dc in [-1, 0, 1]:
-                            if dr == 0 and dc == 0:
-                                continue
-                            new_row, new_col = row + dr, col + dc
-                            if (0 <= new_row < 3 and 0 <= new_col < 3 and 
-                                board[new_row][new_col] == 0):
-                                # Check if the move is valid according to game rules
-                                # For diagonal moves, only allow if it's part of the X pattern
-                                if dr != 0 and dc != 0:  # Diagonal move
-                                    if (row == 0 and col == 0 and new_row == 1 and new_col == 1) or \
-                                       (row == 0 and col == 2 and new_row == 1 and new_col == 1) or \
-                                       (row == 2 and col == 0 and new_row == 1 and new_col == 1) or \
-                                       (row == 2 and col == 2 and new_row == 1 and new_col == 1) or \
-                                       (row == 1 and col == 1 and new_row == 0 and new_col == 0) or \
-                                       (row == 1 and col == 1 and new_row == 0 and new_col == 2) or \
-                                       (row == 1 and col == 1 and new_row == 2 and new_col == 0) or \
-                                       (row == 1 and col == 1 and new_row == 2 and new_col == 2):
-                                        valid_moves.append(((row, col), (new_row, new_col)))
-                                else:  # Horizontal or vertical move
-                                    valid_moves.append(((row, col), (new_row, new_col)))
-        return valid_moves
+        player1_mask, player2_mask = board_to_masks(board)
+        own_mask = player1_mask if player == 1 else player2_mask
+        return [
+            (CELL_POSITIONS[from_index], CELL_POSITIONS[to_index])
+            for from_index, to_index in get_mask_moves(own_mask, player1_mask | player2_mask)
+        ]
 
     def minimax(self, board, depth, alpha, beta, maximizing_player, player):
-        """Minimax algorithm with alpha-beta pruning."""
+        """Minimax algorithm with alpha-beta pruning, on a 3x3 board."""
+        player1_mask, player2_mask = board_to_masks(board)
+        key = zobrist_key_masks(player1_mask, player2_mask, player, maximizing_player)
+        mirror_key = zobrist_key_masks(MIRROR_MASKS[player1_mask], MIRROR_MASKS[player2_mask],
+                                       player, maximizing_player)
+        if player == 1:
+            own_mask, opponent_mask = player1_mask, player2_mask
+        else:
+            own_mask, opponent_mask = player2_mask, player1_mask
+        return self.minimax_masks(own_mask, opponent_mask, depth, alpha, beta, maximizing_player, player,
+                                  key, mirror_key)
+
+    def minimax_masks(self, own_mask, opponent_mask, depth, alpha, beta, maximizing_player, player,
+                      key, mirror_key):
+        """
+        Minimax algorithm with alpha-beta pruning and a transposition table.
+        Moves are made and unmade in place on the bitboards of the searching
+        player (own_mask) and of the opponent, so no board is ever copied.
+        key and mirror_key hash the position and its mirror image; a position
+        and its mirror share the table entry under the smaller of the two,
+        with the best move stored as seen from that key's side.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        if self.deadline is not None and not stats.nodes & 1023 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
         if depth == 0:
-            return self.evaluate_position(board, player)
+            return self.evaluate_masks(own_mask, opponent_mask)
+        # An empty window proves nothing about the position: no table store
+        if alpha >= beta:
+            return alpha
+
+        alpha_orig, beta_orig = alpha, beta
+        mover_mask = own_mask if maximizing_player else opponent_mask
+        valid_moves = get_mask_moves(mover_mask, own_mask | opponent_mask)
+
+        # The mirror preserves the evaluation, so both images have the same value
+        mirrored = mirror_key < key
+        table_key = mirror_key if mirrored else key
+        entry = self.transposition_table.probe(table_key)
+        if entry is not None:
+            entry_depth, entry_value, entry_bound, entry_move = entry
+            # Only results of the same depth are reused: evaluate_position does
+            # not score wins, so a deeper search is not a refinement
+            if entry_depth == depth:
+                if entry_bound == EXACT:
+                    return entry_value
+                if entry_bound == LOWER_BOUND:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if beta <= alpha:
+                    return entry_value
+            if entry_move is not None and mirrored:
+                entry_move = (MIRROR_CELLS[entry_move[0]], MIRROR_CELLS[entry_move[1]])
+        else:
+            entry_move = None
+
+        mover = player if maximizing_player else 3 - player
+        valid_moves = self.order_moves(valid_moves, mover_mask, mover, depth, entry_move)
+        mover_keys = ZOBRIST_KEYS[mover]
+        mirror_mover_keys = MIRROR_ZOBRIST_KEYS[mover]
+        best_move = None
 
-        valid_moves = self.get_valid_moves(board, player if maximizing_player else 3 - player)
-        
         if maximizing_player:
-            max_eval = float('-inf')
-            for (from_row, from_col), (to_row, to_col) in valid_moves:
-                # Make move
-                new_board = copy.deepcopy(board)
-                new_board[to_row][to_col] = player
-                new_board[from_row][from_col] = 0
-                
-                eval = self.minimax(new_board, depth - 1, alpha, beta, False, player)
-                max_eval = max(max_eval, eval)
+            best_eval = float('-inf')
+            for move in valid_moves:
+                from_index, to_index = move
+                step = 1 << from_index | 1 << to_index
+                # Make move, search, unmake move
+                own_mask ^= step
+                eval = self.minimax_masks(own_mask, opponent_mask, depth - 1, alpha, beta, False, player,
+                                          key ^ SIDE_KEY ^ mover_keys[from_index] ^ mover_keys[to_index],
+                                          mirror_key ^ SIDE_KEY ^ mirror_mover_keys[from_index]
+                                          ^ mirror_mover_keys[to_index])
+                own_mask ^= step
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    stats.cutoffs += 1
+                    self.record_cutoff(move, mover, depth)
                     break
-            return max_eval
         else:
-            min_eval = float('inf')
-            for (from_row, from_col), (to_row, to_col) in valid_moves:
-                # Make move
-                new_board = copy.deepcopy(board)
-                new_board[to_row][to_col] = 3 - player
-                new_board[from_row][from_col] = 0
-                
-                eval = self.minimax(new_board, depth - 1, alpha, beta, True, player)
-                min_eval = min(min_eval, eval)
+            best_eval = float('inf')
+            for move in valid_moves:
+                from_index, to_index = move
+                step = 1 << from_index | 1 << to_index
+                # Make move, search, unmake move
+                opponent_mask ^= step
+                eval = self.minimax_masks(own_mask, opponent_mask, depth - 1, alpha, beta, True, player,
+                                          key ^ SIDE_KEY ^ mover_keys[from_index] ^ mover_keys[to_index],
+                                          mirror_key ^ SIDE_KEY ^ mirror_mover_keys[from_index]
+                                          ^ mirror_mover_keys[to_index])
+                opponent_mask ^= step
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    stats.cutoffs += 1
+                    self.record_cutoff(move, mover, depth)
                     break
-            return min_eval
 
-    def get_best_move(self, board, player):
-        """Get the best move for the AI player."""
-        valid_moves = self.get_valid_moves(board, player)
-        if not valid_moves:
-            return None
+        if best_eval <= alpha_orig:
+            bound = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        if best_move is not None and mirrored:
+            best_move = (MIRROR_CELLS[best_move[0]], MIRROR_CELLS[best_move[1]])
+        self.transposition_table.store(table_key, depth, best_eval, bound, best_move)
+        return best_eval
+
+    def order_moves(self, valid_moves, mover_mask, mover, depth, table_move):
+        """
+        Order moves for the search: the transposition table's best move, then
+        moves completing a line, then the killer moves of this depth, then the
+        rest by history score (generation order among equals).
+        """
+        start_row = START_ROW_MASKS[mover]
+        killers = self.killers[depth]
+        history = self.history[mover]
+        first = []
+        wins = []
+        killer_moves = []
+        rest = []
+        for move in valid_moves:
+            from_index, to_index = move
+            new_mask = mover_mask ^ (1 << from_index | 1 << to_index)
+            if move == table_move:
+                first.append(move)
+            elif WINNING_MASKS[new_mask] and new_mask != start_row:
+                wins.append(move)
+            elif move in killers:
+                killer_moves.append(move)
+            else:
+                rest.append(move)
+        if len(killer_moves) > 1 and killer_moves[0] != killers[0]:
+            killer_moves.reverse()
+        if len(rest) > 1:
+            rest.sort(key=lambda move: -history[move[0] * 9 + move[1]])
+        return first + wins + killer_moves + rest
+
+    def record_cutoff(self, move, mover, depth):
+        """Remember a move that caused a cutoff as a killer of its depth and in the history table."""
+        killers = self.killers[depth]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        from_index, to_index = move
+        self.history[mover][from_index * 9 + to_index] += depth * depth
+
+    def reset_move_ordering(self):
+        """Forget the killer moves and history scores of previous searches."""
+        # Two killer moves per remaining depth
+        self.killers = [[None, None] for _ in range(max(MAX_ITERATIVE_DEPTH, self.max_depth) + 1)]
+        # Cutoff scores of each player's (from_index * 9 + to_index) moves
+        self.history = {1: [0] * 81, 2: [0] * 81}
+
+    def get_best_move(self, board, player, time_limit=None, return_stats=False):
+        """
+        Get the best move for the AI player.
+        With a time limit (in seconds, or self.time_limit by default) the
+        search deepens iteratively and returns the best move of the last
+        iteration that finished in time; otherwise it searches max_depth.
+        With return_stats, returns (move, SearchStats) instead of the move.
+        """
+        started = time.perf_counter()
+        stats = self.stats = SearchStats('minimax', self.difficulty)
+        self.reset_move_ordering()
+        table = self.transposition_table
+        hits, misses = table.hits, table.misses
+
+        player1_mask, player2_mask = board_to_masks(board)
+        if player == 1:
+            own_mask, opponent_mask = player1_mask, player2_mask
+        else:
+            own_mask, opponent_mask = player2_mask, player1_mask
 
+        best_move = None
+        valid_moves = get_mask_moves(own_mask, player1_mask | player2_mask)
+        if valid_moves:
+            key = zobrist_key_masks(player1_mask, player2_mask, player, False)
+            mirror_key = zobrist_key_masks(MIRROR_MASKS[player1_mask], MIRROR_MASKS[player2_mask], player, False)
+            keys = (key, mirror_key)
+            if time_limit is None:
+                time_limit = self.time_limit
+            if time_limit is None:
+                best_move = self.search_root(own_mask, opponent_mask, player, keys, valid_moves, self.max_depth)
+                stats.depth = self.max_depth
+                stats.iterations = 1
+            else:
+                deadline = started + time_limit
+                # Depth 1 always completes so that there is a move to play
+                best_move = self.search_root(own_mask, opponent_mask, player, keys, valid_moves, 1)
+                stats.depth = stats.iterations = 1
+                self.deadline = deadline
+                try:
+                    for depth in range(2, MAX_ITERATIVE_DEPTH + 1):
+                        if time.perf_counter() >= deadline:
+                            break
+                        best_move = self.search_root(own_mask, opponent_mask, player, keys, valid_moves, depth)
+                        stats.depth = depth
+                        stats.iterations += 1
+                except SearchTimeout:
+                    stats.timed_out = True
+                finally:
+                    self.deadline = None
+
+            from_index, to_index = best_move
+            best_move = (CELL_POSITIONS[from_index], CELL_POSITIONS[to_index])
+
+        stats.tt_hits = table.hits - hits
+        stats.tt_misses = table.misses - misses
+        stats.elapsed = time.perf_counter() - started
+        if return_stats:
+            return best_move, stats
+        return best_move
+
+    def search_root(self, own_mask, opponent_mask, player, keys, valid_moves, depth):
+        """Search every root move to the given depth and return the best one as cell indices."""
+        if self.workers is not None and self.workers > 1 and len(valid_moves) > 1:
+            return self.search_root_parallel(own_mask, opponent_mask, player, keys, valid_moves, depth)
+
+        # Root moves keep their generation order so that ties go to the same move
         best_move = None
         best_eval = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
-
-        for (from_row, from_col), (to_row, to_col) in valid_moves:
-            # Make move
-            new_board = copy.deepcopy(board)
-            new_board[to_row][to_col] = player
-            new_board[from_row][from_col] = 0
-            
-            eval = self.minimax(new_board, self.max_depth - 1, alpha, beta, False, player)
-            
+        for move in valid_moves:
+            # A move scoring no more than best_eval cannot replace the earlier best move
+            eval = self.score_root_move(own_mask, opponent_mask, player, keys, move, depth, best_eval)
             if eval > best_eval:
                 best_eval = eval
-                best_move = ((from_row, from_col), (to_row, to_col))
+                best_move = move
+                # Nothing beats a win (a blocked opponent); later moves would get an empty window
+                if best_eval == float('inf'):
+                    break
+
+        return best_move
+
+    def score_root_move(self, own_mask, opponent_mask, player, keys, move, depth, alpha=float('-inf')):
+        """
+        Score a root move with a search of depth - 1 plies below it. The value
+        is exact when it is above alpha, an upper bound otherwise.
+        """
+        from_index, to_index = move
+        key, mirror_key = keys
+        own_keys = ZOBRIST_KEYS[player]
+        mirror_own_keys = MIRROR_ZOBRIST_KEYS[player]
+        return self.minimax_masks(own_mask ^ (1 << from_index | 1 << to_index), opponent_mask, depth - 1,
+                                  alpha, float('inf'), False, player,
+                                  key ^ own_keys[from_index] ^ own_keys[to_index],
+                                  mirror_key ^ mirror_own_keys[from_index] ^ mirror_own_keys[to_index])
+
+    def search_root_parallel(self, own_mask, opponent_mask, player, keys, valid_moves, depth):
+        """
+        Root-parallel search_root on a process pool. The first move is searched
+        here with a full window; every other move goes to a worker with the
+        best value known when it is submitted as alpha. A move scoring no more
+        than that alpha is no better than an earlier move, so the first move
+        of best value is chosen, exactly as in the serial search.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(self.transposition_table.max_entries,))
+        stats = self.stats
+
+        best_index = 0
+        best_eval = self.score_root_move(own_mask, opponent_mask, player, keys, valid_moves[0], depth)
+        # future -> (root move index, alpha it was searched with)
+        pending = {}
+        next_index = 1
+        try:
+            while next_index < len(valid_moves) or pending:
+                # Once a move wins, the moves left would only get an empty window
+                if best_eval == float('inf'):
+                    next_index = len(valid_moves)
+                while next_index < len(valid_moves) and len(pending) < self.workers:
+                    time_budget = None
+                    if self.deadline is not None:
+                        time_budget = self.deadline - time.perf_counter()
+                        if time_budget <= 0:
+                            raise SearchTimeout()
+                    future = self.executor.submit(_score_root_move, own_mask, opponent_mask, player, keys,
+                                                  valid_moves[next_index], depth, best_eval, time_budget)
+                    pending[future] = (next_index, best_eval)
+                    next_index += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, alpha = pending.pop(future)
+                    eval, nodes, cutoffs = future.result()
+                    stats.nodes += nodes
+                    stats.cutoffs += cutoffs
+                    if eval > alpha and (eval > best_eval or (eval == best_eval and index < best_index)):
+                        best_eval = eval
+                        best_index = index
+        finally:
+            for future in pending:
+                future.cancel()
 
-        return best_move 
\ No newline at end of file
+        return valid_moves[best_index]
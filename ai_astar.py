@@ -1,10 +1,40 @@
 import heapq
-from typing import List, Tuple, Dict, Set
-import copy
-from game_logic import create_valid_connections, get_valid_moves, is_winning_state
+import time
+from typing import List, Optional, Tuple
+from game_logic import (
+    BOARD_CELLS, CELL_POSITIONS, FULL_MASK, LINE_MASKS, POPCOUNT,
+    TRIT_VALUES, WINNING_MASKS, SearchTimeout, board_to_masks, cell_index,
+    encode_board, get_connection_moves,
+)
+from batch_eval import lookup, mask_matrix, np, score_table
+from search_stats import SearchStats
+from symmetry import MASK_PERMUTATIONS, MIRROR, MIRROR_CANONICAL
+
+# States expanded per unit of max_depth by default, and added to the node cap
+# by every iteration of a time-limited search
+NODES_PER_DEPTH = 100
+
+# Largest node cap (in NODES_PER_DEPTH states) of a time-limited search
+MAX_ITERATIVE_DEPTH = 100
+
+# Heuristic weight of a player's pieces: 2 points per piece for every line it is on
+LINE_WEIGHTS = tuple(
+    sum(POPCOUNT[mask & line] * 2 for line in LINE_MASKS) for mask in range(FULL_MASK + 1)
+)
+
+
+def heuristic_boards(boards: "np.ndarray", player: int) -> "np.ndarray":
+    """
+    Vectorized heuristic over an (N, 9) array of boards
+    """
+    # Weight of every cell: 2 points per line through it
+    cell_weights = mask_matrix(LINE_MASKS).sum(axis=1) * 2
+    return ((boards == 3 - player).astype(np.int32) - (boards == player)) @ cell_weights
+
 
 class ThreeMensMorrisAStar:
-    def __init__(self, difficulty: str = 'medium'):
+    def __init__(self, difficulty: str = 'medium', time_limit: Optional[float] = None,
+                 node_limit: Optional[int] = None):
         self.difficulty = difficulty
         # Adjust search depth based on difficulty
         self.max_depth = {
@@ -12,96 +42,153 @@ class ThreeMensMorrisAStar:
             'medium': 3,
             'hard': 4
         }.get(difficulty, 3)
-        # Create valid connections for move validation
-        self.valid_connections = create_valid_connections()
+        # Wall-clock budget per move in seconds; None uses the max_depth node cap
+        self.time_limit = time_limit
+        # States expanded by a search without time limit
+        self.node_limit = node_limit if node_limit is not None else self.max_depth * NODES_PER_DEPTH
+        # Statistics of the last search
+        self.stats = SearchStats('astar', difficulty)
+        self.search_capped = False
 
-    def get_best_move(self, board: List[List[int]], player: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    def get_best_move(self, board: List[List[int]], player: int, time_limit: Optional[float] = None,
+                      return_stats: bool = False) -> Tuple[Tuple[int, int], Tuple[int, int]]:
         """
         Find the best move using A* algorithm
-        Returns: ((from_row, from_col), (to_row, to_col))
+        With a time limit (in seconds, or self.time_limit by default) the node
+        cap grows iteratively by NODES_PER_DEPTH states and the move of the last
+        search that finished in time is returned; otherwise the cap is node_limit
+        Returns: ((from_row, from_col), (to_row, to_col)),
+        or (move, SearchStats) with return_stats
         """
+        started = time.perf_counter()
+        stats = self.stats = SearchStats('astar', self.difficulty)
+        best_move = None
+
         # First check if there are any valid moves
         valid_moves = self.get_valid_moves(board, player)
         if not valid_moves:
-            return None  # No valid moves available
+            pass  # No valid moves available
+        elif time_limit is None and self.time_limit is None:
+            best_move = self.search(board, player, valid_moves, self.node_limit)
+            stats.iterations = 1
+        else:
+            deadline = started + (self.time_limit if time_limit is None else time_limit)
+            # The first search always completes so that there is a move to play
+            best_move = self.search(board, player, valid_moves, NODES_PER_DEPTH)
+            stats.iterations = 1
+            # A search that stopped before its node cap cannot improve with a larger one
+            while (self.search_capped and stats.iterations < MAX_ITERATIVE_DEPTH
+                   and time.perf_counter() < deadline):
+                try:
+                    best_move = self.search(board, player, valid_moves, (stats.iterations + 1) * NODES_PER_DEPTH,
+                                            deadline)
+                except SearchTimeout:
+                    stats.timed_out = True
+                    break
+                stats.iterations += 1
+
+        stats.elapsed = time.perf_counter() - started
+        if return_stats:
+            return best_move, stats
+        return best_move
+
+    def search(self, board: List[List[int]], player: int,
+               valid_moves: List[Tuple[Tuple[int, int], Tuple[int, int]]],
+               node_limit: int, deadline: Optional[float] = None) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """
+        A* search expanding at most node_limit states
+        Raises SearchTimeout when the deadline passes
+        Returns: ((from_row, from_col), (to_row, to_col))
+        """
+        self.search_capped = False
+        stats = self.stats
+
+        player1_mask, player2_mask = board_to_masks(board)
+        if player == 1:
+            own_mask, opponent_mask = player1_mask, player2_mask
+        else:
+            own_mask, opponent_mask = player2_mask, player1_mask
+        # Only the player's pieces move during the search, so the opponent's
+        # share of the heuristic and of the state code is constant and a state
+        # is identified by own_mask alone
+        opponent_weight = LINE_WEIGHTS[opponent_mask]
+        opponent_code = TRIT_VALUES[opponent_mask] * (3 - player)
+        # When the opponent's pieces are mirror-symmetric a state and its mirror
+        # image are equivalent (same heuristic, same distance to a win), so the
+        # closed set and g_score use the canonical one of the two
+        if MASK_PERMUTATIONS[MIRROR][opponent_mask] == opponent_mask:
+            state_keys = MIRROR_CANONICAL
+        else:
+            state_keys = range(FULL_MASK + 1)
 
         # Priority queue for A* search
-        # Format: (f_score, move_count, board_state, move)
-        open_set = []
-        # Set to keep track of visited states
+        # Format: (f_score, move_count, state code, first move, own_mask)
+        # The base-3 state code breaks ties like the board lists it replaces;
+        # the first move is from_index * 9 + to_index, -1 at the root
+        open_set = [(opponent_weight - LINE_WEIGHTS[own_mask], 0,
+                     opponent_code + TRIT_VALUES[own_mask] * player, -1, own_mask)]
+        stats.heap_pushes += 1
+        # States already expanded
         closed_set = set()
-        # Dictionary to store g_scores (cost from start to current)
-        g_score = {}
-        # Dictionary to store f_scores (g_score + heuristic)
-        f_score = {}
-        
-        # Initialize with current board state
-        board_key = self.get_board_state_key(board)
-        g_score[board_key] = 0
-        f_score[board_key] = self.heuristic(board, player)
-        heapq.heappush(open_set, (f_score[board_key], 0, board, None))
-        
-        while open_set and len(closed_set) < self.max_depth * 100:  # Limit search depth
+        # Best known cost from the start of every state pushed
+        g_score = {state_keys[own_mask]: 0}
+
+        while open_set:
+            # Limit search depth
+            if len(closed_set) >= node_limit:
+                self.search_capped = True
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                stats.expanded += len(closed_set)
+                raise SearchTimeout()
+
             # Get the state with lowest f_score
-            current_f, move_count, current_board, current_move = heapq.heappop(open_set)
-            current_key = self.get_board_state_key(current_board)
-            
-            # Skip if we've seen this state
-            if current_key in closed_set:
+            _, move_count, _, first_move, current_mask = heapq.heappop(open_set)
+            stats.nodes += 1
+            if move_count > stats.depth:
+                stats.depth = move_count
+
+            # Skip expanded states and entries superseded by a shorter path
+            current_key = state_keys[current_mask]
+            if current_key in closed_set or move_count > g_score[current_key]:
                 continue
-                
-            # Add to closed set
             closed_set.add(current_key)
-            
+
             # If this is a winning state, return the move that led to it
-            if is_winning_state(current_board, player):
-                return current_move if current_move else valid_moves[0]
-            
-            # Get all valid moves from current state
-            current_valid_moves = self.get_valid_moves(current_board, player)
-            if not current_valid_moves:
-                continue  # Skip if no valid moves from this state
-            
-            for from_pos, to_pos in current_valid_moves:
-                # Create new board state
-                new_board = copy.deepcopy(current_board)
-                from_row, from_col = from_pos
-                to_row, to_col = to_pos
-                new_board[to_row][to_col] = new_board[from_row][from_col]
-                new_board[from_row][from_col] = 0
-                
-                new_key = self.get_board_state_key(new_board)
-                
-                # Calculate new g_score
-                tentative_g_score = g_score[current_key] + 1
-                
-                # If this is a better path to this state
-                if new_key not in g_score or tentative_g_score < g_score[new_key]:
-                    g_score[new_key] = tentative_g_score
-                    f_score[new_key] = tentative_g_score + self.heuristic(new_board, player)
-                    
-                    # If this is the first move, store it
-                    move_to_store = current_move if current_move else (from_pos, to_pos)
-                    
-                    # Add to open set
-                    heapq.heappush(open_set, (f_score[new_key], move_count + 1, new_board, move_to_store))
-        
+            if WINNING_MASKS[current_mask]:
+                stats.expanded += len(closed_set)
+                if first_move < 0:
+                    return valid_moves[0]
+                from_index, to_index = divmod(first_move, BOARD_CELLS)
+                return CELL_POSITIONS[from_index], CELL_POSITIONS[to_index]
+
+            new_g = move_count + 1
+            for from_index, to_index in get_connection_moves(current_mask, current_mask | opponent_mask):
+                new_mask = current_mask ^ (1 << from_index | 1 << to_index)
+                new_key = state_keys[new_mask]
+                # Only push states that are new or reached by a shorter path
+                if new_key in closed_set or g_score.get(new_key, new_g + 1) <= new_g:
+                    continue
+                g_score[new_key] = new_g
+                # If this is the first move, store it
+                move = first_move if first_move >= 0 else from_index * BOARD_CELLS + to_index
+                heapq.heappush(open_set, (new_g + opponent_weight - LINE_WEIGHTS[new_mask], new_g,
+                                          opponent_code + TRIT_VALUES[new_mask] * player, move, new_mask))
+                stats.heap_pushes += 1
+
+        stats.expanded += len(closed_set)
+
         # If we haven't found a winning state, return the move that leads to the best heuristic value
         best_move = None
         best_heuristic = float('inf')
-        
+
         for from_pos, to_pos in valid_moves:
-            new_board = copy.deepcopy(board)
-            from_row, from_col = from_pos
-            to_row, to_col = to_pos
-            new_board[to_row][to_col] = new_board[from_row][from_col]
-            new_board[from_row][from_col] = 0
-            
-            h = self.heuristic(new_board, player)
+            new_mask = own_mask ^ (1 << cell_index(*from_pos) | 1 << cell_index(*to_pos))
+            h = opponent_weight - LINE_WEIGHTS[new_mask]
             if h < best_heuristic:
                 best_heuristic = h
                 best_move = (from_pos, to_pos)
-        
+
         return best_move
 
     def get_valid_moves(self, board: List[List[int]], player: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
@@ -109,80 +196,43 @@ class ThreeMensMorrisAStar:
         Get all valid moves for the current player using the game's validation logic
         Returns: List of ((from_row, from_col), (to_row, to_col)) tuples
         """
-        valid_moves = []
-        
-        # Find all player's pieces
-        for row in range(3):
-            for col in range(3):
-                if board[row][col] == player:
-                    # Use the game logic's get_valid_moves function
-                    possible_moves = get_valid_moves(board, row, col, self.valid_connections)
-                    for new_row, new_col in possible_moves:
-                        valid_moves.append(((row, col), (new_row, new_col)))
-        
-        return valid_moves
+        player1_mask, player2_mask = board_to_masks(board)
+        own_mask = player1_mask if player == 1 else player2_mask
+
+        # Neighbors are visited in create_valid_connections() order
+        return [
+            (CELL_POSITIONS[from_index], CELL_POSITIONS[to_index])
+            for from_index, to_index in get_connection_moves(own_mask, player1_mask | player2_mask)
+        ]
 
     def heuristic(self, board: List[List[int]], player: int) -> float:
         """
         Calculate heuristic value for the current board state
         Lower values are better for the current player
         """
-        score = 0
-        opponent = 3 - player
-
-        # Check rows
-        for row in range(3):
-            player_count = 0
-            opponent_count = 0
-            for col in range(3):
-                if board[row][col] == player:
-                    player_count += 1
-                elif board[row][col] == opponent:
-                    opponent_count += 1
-            # Reward for having more pieces in a row
-            score -= (player_count * 2)
-            # Penalize opponent's pieces in a row
-            score += (opponent_count * 2)
-
-        # Check columns
-        for col in range(3):
-            player_count = 0
-            opponent_count = 0
-            for row in range(3):
-                if board[row][col] == player:
-                    player_count += 1
-                elif board[row][col] == opponent:
-                    opponent_count += 1
-            score -= (player_count * 2)
-            score += (opponent_count * 2)
-
-        # Check diagonals
-        # Main diagonal (top-left to bottom-right)
-        player_count = 0
-        opponent_count = 0
-        for i in range(3):
-            if board[i][i] == player:
-                player_count += 1
-            elif board[i][i] == opponent:
-                opponent_count += 1
-        score -= (player_count * 2)
-        score += (opponent_count * 2)
-
-        # Secondary diagonal (top-right to bottom-left)
-        player_count = 0
-        opponent_count = 0
-        for i in range(3):
-            if board[i][2-i] == player:
-                player_count += 1
-            elif board[i][2-i] == opponent:
-                opponent_count += 1
-        score -= (player_count * 2)
-        score += (opponent_count * 2)
-
-        return score
-
-    def get_board_state_key(self, board: List[List[int]]) -> str:
+        player1_mask, player2_mask = board_to_masks(board)
+        if player == 1:
+            return self.mask_heuristic(player1_mask, player2_mask)
+        return self.mask_heuristic(player2_mask, player1_mask)
+
+    def heuristic_batch(self, boards, player) -> "np.ndarray":
+        """
+        Heuristic of an (N, 9) integer array of boards for player (1, 2 or an
+        (N,) array of them), equal to heuristic on every board; requires numpy
+        Returns: (N,) array of scores
+        """
+        return lookup(score_table('ThreeMensMorrisAStar.heuristic', heuristic_boards), boards, player)
+
+    def mask_heuristic(self, own_mask: int, opponent_mask: int) -> float:
+        """
+        Heuristic of a position given as bitboards of the player and the opponent:
+        2 points per piece on each row, column and diagonal, rewarded for the
+        player and penalized for the opponent
+        """
+        return LINE_WEIGHTS[opponent_mask] - LINE_WEIGHTS[own_mask]
+
+    def get_board_state_key(self, board: List[List[int]]) -> int:
         """
-        Convert board state to a string key for hashing
+        Convert board state to its base-3 integer code for hashing
         """
-        return ''.join(str(cell) for row in board for cell in row) 
\ No newline at end of file
+        return encode_board(board)
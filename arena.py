@@ -0,0 +1,230 @@
+"""
+Headless arena: plays every pairing of engines and difficulties against each
+other on a process pool, without opening a window.
+
+    python arena.py --games 20 --workers 4
+    python arena.py --engines minimax astar tablebase --time-limit 0.05 --json results.json
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from engines import DIFFICULTIES, ENGINE_TYPES
+from game_logic import (
+    board_to_masks, cell_index, create_start_board, get_mask_moves, get_mask_winner, masks_to_board,
+)
+from game_state import REPETITION_LIMIT
+from tablebase import load_tablebase
+
+
+def create_engine(engine_type: str, difficulty: str, time_limit: Optional[float] = None):
+    """
+    Create an engine by name, with an optional time budget per move
+    """
+    if time_limit is not None and engine_type != 'tablebase':
+        return ENGINE_TYPES[engine_type](difficulty, time_limit=time_limit)
+    return ENGINE_TYPES[engine_type](difficulty)
+
+
+def play_game(task: dict) -> dict:
+    """
+    Play one game between task['first'] (player 1) and task['second'] (player 2),
+    both given as (engine type, difficulty)
+    Games end as draws after max_plies or on the REPETITION_LIMIT-th occurrence of a position
+    Returns: winner (1, 2 or None for a draw), plies played and the think time
+    of every engine move, per player
+    """
+    engines = {
+        1: create_engine(*task['first'], time_limit=task['time_limit']),
+        2: create_engine(*task['second'], time_limit=task['time_limit']),
+    }
+    player1_mask, player2_mask = board_to_masks(create_start_board())
+    player = 1
+    latencies = {1: [], 2: []}
+    rng = random.Random(task['seed'])
+    winner = None
+    plies = 0
+    # Occurrences of every position (bitboards and side to move): a repeated one draws the game
+    positions = {player1_mask | player2_mask << 9 | player << 18: 1}
+
+    while plies < task['max_plies']:
+        own_mask = player1_mask if player == 1 else player2_mask
+        moves = get_mask_moves(own_mask, player1_mask | player2_mask)
+        if not moves:
+            # A blocked player loses
+            winner = 3 - player
+            break
+
+        if plies < task['random_plies']:
+            # Random opening so that deterministic engines play different games
+            move = rng.choice(moves)
+        else:
+            board = masks_to_board(player1_mask, player2_mask)
+            started = time.perf_counter()
+            best_move = engines[player].get_best_move(board, player)
+            latencies[player].append(time.perf_counter() - started)
+            move = None
+            if best_move is not None:
+                (from_row, from_col), (to_row, to_col) = best_move
+                move = (cell_index(from_row, from_col), cell_index(to_row, to_col))
+            if move not in moves:
+                # An illegal answer forfeits the game
+                winner = 3 - player
+                break
+
+        from_index, to_index = move
+        step = 1 << from_index | 1 << to_index
+        if player == 1:
+            player1_mask ^= step
+        else:
+            player2_mask ^= step
+        plies += 1
+
+        winner = get_mask_winner(player1_mask, player2_mask)
+        if winner:
+            break
+        player = 3 - player
+
+        key = player1_mask | player2_mask << 9 | player << 18
+        positions[key] = positions.get(key, 0) + 1
+        if positions[key] >= REPETITION_LIMIT:
+            break
+
+    return {
+        'first': task['first'],
+        'second': task['second'],
+        'winner': winner,
+        'plies': plies,
+        'latencies': latencies,
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(fraction * len(ordered) + 0.999999) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def build_tasks(engine_types: List[str], games: int, random_plies: int, max_plies: int,
+                time_limit: Optional[float], seed: int) -> List[dict]:
+    """
+    N games for every ordered pairing of (engine type, difficulty)
+    """
+    players = [(engine_type, difficulty) for engine_type in engine_types for difficulty in DIFFICULTIES]
+    tasks = []
+    for first, second in product(players, repeat=2):
+        for game_number in range(games):
+            tasks.append({
+                'first': first,
+                'second': second,
+                'seed': seed * 100003 + game_number,
+                'random_plies': random_plies,
+                'max_plies': max_plies,
+                'time_limit': time_limit,
+            })
+    return tasks
+
+
+def summarize(results: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Aggregate game results per pairing and per engine
+    """
+    pairings: Dict[Tuple, dict] = {}
+    engines: Dict[Tuple, List[float]] = {}
+    for result in results:
+        pairing = pairings.setdefault((result['first'], result['second']), {
+            'first': '/'.join(result['first']),
+            'second': '/'.join(result['second']),
+            'games': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'plies': 0,
+        })
+        pairing['games'] += 1
+        pairing['plies'] += result['plies']
+        if result['winner'] == 1:
+            pairing['wins'] += 1
+        elif result['winner'] == 2:
+            pairing['losses'] += 1
+        else:
+            pairing['draws'] += 1
+        engines.setdefault(result['first'], []).extend(result['latencies'][1])
+        engines.setdefault(result['second'], []).extend(result['latencies'][2])
+
+    pairing_rows = []
+    for pairing in pairings.values():
+        games = pairing.pop('games')
+        pairing_rows.append({
+            'first': pairing['first'],
+            'second': pairing['second'],
+            'games': games,
+            'win_rate': pairing['wins'] / games,
+            'draw_rate': pairing['draws'] / games,
+            'loss_rate': pairing['losses'] / games,
+            'average_plies': pairing['plies'] / games,
+        })
+
+    engine_rows = []
+    for engine, latencies in engines.items():
+        total = sum(latencies)
+        engine_rows.append({
+            'engine': '/'.join(engine),
+            'moves': len(latencies),
+            'moves_per_second': len(latencies) / total if total else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p90_ms': percentile(latencies, 0.90) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': max(latencies, default=0.0) * 1000,
+        })
+    return pairing_rows, engine_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play engines against each other without a window")
+    parser.add_argument("--games", type=int, default=10, help="games per pairing")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINE_TYPES), default=['minimax', 'astar'])
+    parser.add_argument("--random-plies", type=int, default=2, help="random opening plies of every game")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies after which a game is drawn")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per move instead of fixed depth")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if 'tablebase' in args.engines:
+        # Build the table once before the workers map it
+        load_tablebase()
+
+    tasks = build_tasks(args.engines, args.games, args.random_plies, args.max_plies, args.time_limit, args.seed)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(play_game, tasks, chunksize=max(args.games // 2, 1)))
+    elapsed = time.perf_counter() - started
+    pairing_rows, engine_rows = summarize(results)
+
+    print(f"{len(results)} games in {elapsed:.1f} s")
+    print()
+    print(f"{'player 1':<20}{'player 2':<20}{'win':>7}{'draw':>7}{'loss':>7}{'plies':>8}")
+    for row in pairing_rows:
+        print(f"{row['first']:<20}{row['second']:<20}{row['win_rate']:>7.0%}{row['draw_rate']:>7.0%}"
+              f"{row['loss_rate']:>7.0%}{row['average_plies']:>8.1f}")
+    print()
+    print(f"{'engine':<20}{'moves':>8}{'moves/s':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for row in engine_rows:
+        print(f"{row['engine']:<20}{row['moves']:>8}{row['moves_per_second']:>10.0f}{row['p50_ms']:>9.2f}"
+              f"{row['p90_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['max_ms']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({'games': len(results), 'seconds': elapsed,
+                       'pairings': pairing_rows, 'engines': engine_rows}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Vectorized scoring of many positions at once with NumPy.
+
+NumPy is optional: the game and the engines run without it, only the batch
+evaluation needs it. Boards are given as an (N, 9) integer array (cells in
+row-major order, 0 = empty, 1 and 2 = players) or anything that reshapes to it.
+
+A scoring function is computed once for all 3**9 boards with matrix
+operations, then batches are scored by looking up their base-3 codes.
+"""
+from typing import Callable, Dict, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from game_logic import BOARD_CELLS, STATE_COUNT
+
+_tables: Dict[str, "np.ndarray"] = {}
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise ImportError("Batch evaluation requires numpy (pip install numpy)")
+
+
+def mask_matrix(masks: Sequence[int]) -> "np.ndarray":
+    """
+    (9, len(masks)) 0/1 matrix whose column j holds the cells of masks[j]
+    """
+    require_numpy()
+    return np.array([[mask >> index & 1 for mask in masks] for index in range(BOARD_CELLS)], dtype=np.int32)
+
+
+def all_boards() -> "np.ndarray":
+    """
+    (3**9, 9) array of every board, row i being the board of base-3 code i
+    """
+    require_numpy()
+    return np.indices((3,) * BOARD_CELLS, dtype=np.int8).reshape(BOARD_CELLS, -1).T
+
+
+def board_codes(boards) -> "np.ndarray":
+    """
+    Base-3 codes (game_logic.encode_board) of an (N, 9) array of boards
+    """
+    require_numpy()
+    boards = np.asarray(boards)
+    if boards.ndim == 3:
+        boards = boards.reshape(len(boards), BOARD_CELLS)
+    if boards.ndim != 2 or boards.shape[1] != BOARD_CELLS:
+        raise ValueError(f"Expected an (N, 9) array of boards, got shape {boards.shape}")
+    if boards.size and (boards.min() < 0 or boards.max() > 2):
+        raise ValueError("Board cells must be 0 (empty), 1 or 2")
+    return boards.astype(np.int32) @ 3 ** np.arange(BOARD_CELLS - 1, -1, -1, dtype=np.int32)
+
+
+def score_table(name: str, score: Callable[["np.ndarray", int], "np.ndarray"]) -> "np.ndarray":
+    """
+    (2, 3**9) table of score(all_boards(), player) for players 1 and 2,
+    computed on first use and cached under name
+    """
+    table = _tables.get(name)
+    if table is None:
+        boards = all_boards()
+        table = _tables[name] = np.stack([score(boards, 1), score(boards, 2)]).astype(np.int64)
+        assert table.shape == (2, STATE_COUNT)
+    return table
+
+
+def lookup(table: "np.ndarray", boards, player) -> "np.ndarray":
+    """
+    (N,) scores of boards for player (1, 2 or an (N,) array of them)
+    Raises: ValueError for a player other than 1 or 2, or a cell outside 0-2
+    """
+    players = np.asarray(player)
+    if not np.isin(players, (1, 2)).all():
+        raise ValueError("player must be 1 or 2")
+    return table[players - 1, board_codes(boards)]
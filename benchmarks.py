@@ -0,0 +1,280 @@
+"""
+Benchmarks of the engine hot paths over a fixed corpus of positions.
+
+    python benchmarks.py                          # print timings and search nodes/s
+    python benchmarks.py --save baseline.json     # store the timings as a baseline
+    python benchmarks.py --compare baseline.json  # fail when a path got slower than the baseline
+
+A comparison exits with status 1 when a benchmark is slower than its
+baseline by more than --threshold (25% by default).
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ai import ThreeMensMorrisAI
+from ai_astar import ThreeMensMorrisAStar
+from batch_eval import np
+from game_logic import (
+    board_to_masks, create_start_board, create_valid_connections, get_mask_moves, get_mask_winner,
+    get_valid_moves, is_winning_state, masks_to_board,
+)
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+ENGINES = {
+    'minimax': ThreeMensMorrisAI,
+    'astar': ThreeMensMorrisAStar,
+}
+
+
+def build_corpus(size: int = 64, seed: int = 2024) -> List[Tuple[List[List[int]], int]]:
+    """
+    Distinct undecided positions reached by random play from the start position
+    Returns: List of (board, player to move)
+    """
+    rng = random.Random(seed)
+    corpus = []
+    seen = set()
+    while len(corpus) < size:
+        player1_mask, player2_mask = board_to_masks(create_start_board())
+        player = 1
+        for _ in range(rng.randint(0, 20)):
+            own_mask = player1_mask if player == 1 else player2_mask
+            moves = get_mask_moves(own_mask, player1_mask | player2_mask)
+            if not moves:
+                break
+            from_index, to_index = rng.choice(moves)
+            step = 1 << from_index | 1 << to_index
+            if player == 1:
+                player1_mask ^= step
+            else:
+                player2_mask ^= step
+            player = 3 - player
+            if get_mask_winner(player1_mask, player2_mask):
+                break
+        if get_mask_winner(player1_mask, player2_mask) or (player1_mask, player2_mask, player) in seen:
+            continue
+        seen.add((player1_mask, player2_mask, player))
+        corpus.append((masks_to_board(player1_mask, player2_mask), player))
+    return corpus
+
+
+def bench_search(engine_name: str, difficulty: str, corpus, repeat: int = 3) -> dict:
+    """
+    Run get_best_move over the corpus with a fresh engine per pass
+    Returns: nodes, seconds and nodes per second of the fastest pass
+    """
+    best = None
+    for _ in range(repeat):
+        engine = ENGINES[engine_name](difficulty)
+        nodes = 0
+        started = time.perf_counter()
+        for board, player in corpus:
+            engine.get_best_move(board, player)
+            nodes += engine.stats.nodes
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[1]:
+            best = (nodes, elapsed)
+    nodes, elapsed = best
+    return {
+        'nodes': nodes,
+        'seconds': elapsed,
+        'nodes_per_second': nodes / elapsed if elapsed else 0.0,
+    }
+
+
+def micro_benchmarks(corpus) -> Dict[str, Callable[[], None]]:
+    """
+    Benchmarks by name; each one runs its path once over every corpus position
+    """
+    connections = create_valid_connections()
+    minimax = ThreeMensMorrisAI()
+    astar = ThreeMensMorrisAStar()
+    pieces = [
+        (board, row, col)
+        for board, player in corpus
+        for row in range(3) for col in range(3) if board[row][col] == player
+    ]
+
+    def get_valid_moves_bench():
+        for board, row, col in pieces:
+            get_valid_moves(board, row, col, connections)
+
+    def is_winning_state_bench():
+        for board, player in corpus:
+            is_winning_state(board, player)
+
+    def evaluate_position_bench():
+        for board, player in corpus:
+            minimax.evaluate_position(board, player)
+
+    def count_valid_moves_bench():
+        for board, player in corpus:
+            minimax.count_valid_moves(board, player)
+
+    def heuristic_bench():
+        for board, player in corpus:
+            astar.heuristic(board, player)
+
+    def get_board_state_key_bench():
+        for board, _ in corpus:
+            astar.get_board_state_key(board)
+
+    benchmarks = {
+        'game_logic.get_valid_moves': get_valid_moves_bench,
+        'game_logic.is_winning_state': is_winning_state_bench,
+        'ThreeMensMorrisAI.evaluate_position': evaluate_position_bench,
+        'ThreeMensMorrisAI.count_valid_moves': count_valid_moves_bench,
+        'ThreeMensMorrisAStar.heuristic': heuristic_bench,
+        'ThreeMensMorrisAStar.get_board_state_key': get_board_state_key_bench,
+    }
+    if np is not None:
+        # The whole corpus as one (N, 9) array, scored in a single call
+        boards = np.array([[cell for row in board for cell in row] for board, _ in corpus])
+        players = np.array([player for _, player in corpus])
+        minimax.evaluate_batch(boards, players)
+        astar.heuristic_batch(boards, players)
+
+        def evaluate_batch_bench():
+            minimax.evaluate_batch(boards, players)
+
+        def heuristic_batch_bench():
+            astar.heuristic_batch(boards, players)
+
+        benchmarks['ThreeMensMorrisAI.evaluate_batch'] = evaluate_batch_bench
+        benchmarks['ThreeMensMorrisAStar.heuristic_batch'] = heuristic_batch_bench
+
+    for engine_class in ENGINES.values():
+        for difficulty in DIFFICULTIES:
+            benchmarks[f'{engine_class.__name__}.get_best_move[{difficulty}]'] = _best_move_bench(
+                engine_class, difficulty, corpus)
+    return benchmarks
+
+
+def _best_move_bench(engine_class, difficulty: str, corpus) -> Callable[[], None]:
+    def bench():
+        # A fresh engine per pass so that cached results do not carry over
+        engine = engine_class(difficulty)
+        for board, player in corpus:
+            engine.get_best_move(board, player)
+    return bench
+
+
+def time_benchmark(bench: Callable[[], None], repeat: int = 5, min_time: float = 0.05) -> float:
+    """
+    Best time of one pass, in seconds, over repeat rounds of at least min_time each
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            bench()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            bench()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+
+def run_suite(corpus, names: Optional[List[str]] = None, repeat: int = 5) -> Dict[str, dict]:
+    """
+    Time every benchmark (or only those in names)
+    Returns: name -> {'us_per_position': ..., 'us_per_pass': ...}
+    """
+    results = {}
+    for name, bench in micro_benchmarks(corpus).items():
+        if names and name not in names:
+            continue
+        seconds = time_benchmark(bench, repeat)
+        results[name] = {
+            'us_per_pass': seconds * 1e6,
+            'us_per_position': seconds * 1e6 / len(corpus),
+        }
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Names of the benchmarks slower than their baseline by more than threshold
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result['us_per_pass'] > reference['us_per_pass'] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine hot paths")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before a comparison fails (0.25 = 25%%)")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per benchmark")
+    parser.add_argument("--corpus-size", type=int, default=64)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.corpus_size)
+    results = run_suite(corpus, args.only, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            stored = json.load(baseline_file)
+        if stored.get('corpus_size') != args.corpus_size:
+            parser.error(f"the baseline was recorded on a corpus of {stored.get('corpus_size')} positions")
+        baseline = stored['results']
+
+    print(f"{'benchmark':<48}{'us/position':>14}{'baseline':>12}{'change':>9}")
+    for name, result in results.items():
+        line = f"{name:<48}{result['us_per_position']:>14.2f}"
+        if baseline and name in baseline:
+            reference = baseline[name]['us_per_position']
+            line += f"{reference:>12.2f}{result['us_per_position'] / reference - 1:>+9.0%}"
+        print(line)
+
+    print()
+    print(f"{'engine':<10}{'difficulty':<12}{'nodes':>10}{'ms':>10}{'nodes/s':>12}")
+    for engine_name in ENGINES:
+        for difficulty in DIFFICULTIES:
+            result = bench_search(engine_name, difficulty, corpus)
+            print(f"{engine_name:<10}{difficulty:<12}{result['nodes']:>10}"
+                  f"{result['seconds'] * 1000:>10.1f}{result['nodes_per_second']:>12.0f}")
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump({
+                'corpus_size': args.corpus_size,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, baseline_file, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nSlower than the baseline by more than {args.threshold:.0%}:")
+            for name in regressions:
+                print(f"  {name}")
+            sys.exit(1)
+        print(f"\nNo benchmark slower than the baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Engine core on flat 9-cell boards, shared by both games.
+
+A board is a flat list of 9 cells indexed row * 3 + col, holding the labels
+of the game that owns it: None / 0 / 1 in main.py, 0 / 1 / 2 in game.py.
+The rules of each game are a Rules object: labels, adjacency of the cells,
+win rule, symmetries and number of pieces placed before pieces move
+(0 when the game starts with all pieces on the board).
+
+Moves are (from_index, to_index) pairs, from_index being None for a
+placement. A Rules object also plays moves on immutable GameState objects
+(game_state.py), for callers that keep whole positions.
+"""
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from game_logic import (
+    ADJACENCY_MASKS, FULL_MASK, LINE_MASKS, MASK_CELLS, NEIGHBORS, POPCOUNT, START_ROW_MASKS, get_line_winner,
+    get_mask_moves, get_mask_winner,
+)
+from game_state import MOVING, PLACING, GameState
+from search_stats import SearchStats
+from symmetry import BOARD_SYMMETRIES, GAME_SYMMETRIES
+
+WIN_SCORE = 10000
+CENTER_BIT = 1 << 4
+
+# Score of an open line (no opponent piece on it) by number of own pieces on it
+OPEN_LINE_SCORES = (0, 1, 10, 0)
+
+Move = Tuple[Optional[int], int]
+
+
+class Rules:
+    """
+    Rules of one game, on flat cell indices
+    """
+
+    def __init__(self, name: str, labels: Tuple[object, object], empty: object,
+                 neighbors: Sequence[Sequence[int]], winner_of: Callable[[int, int], Optional[int]],
+                 symmetries: Sequence[int], placing_pieces: int):
+        self.name = name
+        # Cell labels of the first and second player, and of an empty cell
+        self.labels = labels
+        self.empty = empty
+        self.adjacency_masks = tuple(sum(1 << index for index in cells) for cells in neighbors)
+        # Moving-phase moves come from the shared move cache on the board's usual graph
+        self.cached_moves = self.adjacency_masks == ADJACENCY_MASKS
+        # winner_of(first_mask, second_mask) -> 1, 2 or None
+        self.winner_of = winner_of
+        self.symmetries = symmetries
+        # Pieces each player places on an empty board before moving (0: no placing phase)
+        self.placing_pieces = placing_pieces
+
+    def board_masks(self, board: Sequence[object]) -> Tuple[int, int]:
+        """
+        Bitboards of the first and second player on a flat board
+        """
+        first, second = self.labels
+        first_mask = second_mask = 0
+        for index, cell in enumerate(board):
+            if cell == first:
+                first_mask |= 1 << index
+            elif cell == second:
+                second_mask |= 1 << index
+        return first_mask, second_mask
+
+    def side(self, label) -> int:
+        """
+        1 for the first player's label, 2 for the second's
+        """
+        return self.labels.index(label) + 1
+
+    def is_placing(self, occupied_mask: int) -> bool:
+        return POPCOUNT[occupied_mask] < self.placing_pieces * 2
+
+    def legal_moves(self, own_mask: int, opponent_mask: int) -> Sequence[Move]:
+        """
+        Placements on every empty cell while placing, otherwise steps to adjacent empty cells
+        """
+        occupied = own_mask | opponent_mask
+        if self.is_placing(occupied):
+            return [(None, index) for index in MASK_CELLS[FULL_MASK & ~occupied]]
+        if self.cached_moves:
+            return get_mask_moves(own_mask, occupied)
+        return [
+            (from_index, to_index)
+            for from_index in MASK_CELLS[own_mask]
+            for to_index in MASK_CELLS[self.adjacency_masks[from_index] & ~occupied]
+        ]
+
+    def start_state(self) -> GameState:
+        """
+        State before the first move: an empty board while placing, pieces on their start rows otherwise
+        """
+        if self.placing_pieces:
+            return GameState(0, 1, PLACING)
+        return GameState.from_masks(START_ROW_MASKS[1], START_ROW_MASKS[2], 1, MOVING)
+
+    def state_moves(self, state: GameState) -> Sequence[Move]:
+        """
+        Legal moves of the side to move, none once the game is over
+        """
+        if state.winner is not None:
+            return ()
+        return self.legal_moves(*state.own_masks())
+
+    def play_state(self, state: GameState, move: Move) -> GameState:
+        """
+        State after a move of the side to move; a side left without a legal move loses
+        Raises: ValueError if the game is over or the move is illegal
+        """
+        if state.winner is not None:
+            raise ValueError("the game is over")
+        if move not in self.state_moves(state):
+            raise ValueError("illegal move")
+
+        first_mask, second_mask = state.masks()
+        if state.side == 1:
+            first_mask = FlatEngine.play(first_mask, move)
+        else:
+            second_mask = FlatEngine.play(second_mask, move)
+        side = 3 - state.side
+        phase = PLACING if self.is_placing(first_mask | second_mask) else MOVING
+        winner = self.winner_of(first_mask, second_mask)
+        if winner is None:
+            own_mask, opponent_mask = (first_mask, second_mask) if side == 1 else (second_mask, first_mask)
+            if not self.legal_moves(own_mask, opponent_mask):
+                winner = 3 - side
+        return GameState.from_masks(first_mask, second_mask, side, phase, winner)
+
+
+# Adjacency of main.py (adjacent_positions): the center reaches all 8 cells, which
+# makes it the same graph as create_valid_connections() (NEIGHBORS)
+MAIN_NEIGHBORS = (
+    (1, 3, 4), (0, 2, 4), (1, 4, 5),
+    (0, 4, 6), (0, 1, 2, 3, 5, 6, 7, 8), (2, 4, 8),
+    (3, 4, 7), (4, 6, 8), (4, 5, 7),
+)
+
+# game.py: pieces start on their rows, no line counts while a player still holds their start row
+FIXED_START_RULES = Rules('fixed-start', (1, 2), 0, NEIGHBORS, get_mask_winner, GAME_SYMMETRIES, 0)
+# main.py: 3 pieces each are placed first, any line wins
+PLACE_AND_MOVE_RULES = Rules('place-and-move', (0, 1), None, MAIN_NEIGHBORS, get_line_winner,
+                             BOARD_SYMMETRIES, 3)
+
+
+class FlatEngine:
+    """
+    Alpha-beta (negamax) search over both phases of a game's rules, with
+    wins detected as they happen. An opening book (opening_book.py) may
+    answer the placing phase instead of the search.
+    """
+
+    def __init__(self, rules: Rules, difficulty: str = 'medium', opening_book=None):
+        self.rules = rules
+        self.difficulty = difficulty
+        self.max_depth = {
+            'easy': 1,
+            'medium': 3,
+            'hard': 6
+        }.get(difficulty, 3)
+        self.opening_book = opening_book
+        # Statistics of the last search
+        self.stats = SearchStats('core', difficulty)
+
+    def get_best_move(self, board: Sequence[object], player, return_stats: bool = False) -> Optional[Move]:
+        """
+        Best move of player (a cell label of the rules) on a flat board
+        Returns: (from_index or None, to_index), None if there is no move,
+        or (move, SearchStats) with return_stats
+        """
+        first_mask, second_mask = self.rules.board_masks(board)
+        best_move = self.get_best_move_masks(first_mask, second_mask, self.rules.side(player))
+        if return_stats:
+            return best_move, self.stats
+        return best_move
+
+    def get_best_move_state(self, state: GameState) -> Optional[Move]:
+        """
+        Best move of the side to move in a game state
+        """
+        if state.winner is not None:
+            return None
+        return self.get_best_move_masks(*state.masks(), state.side)
+
+    def get_best_move_masks(self, first_mask: int, second_mask: int, side: int) -> Optional[Move]:
+        """
+        Best move of side (1 or 2) on a position given as bitboards
+        """
+        stats = self.stats = SearchStats('core', self.difficulty)
+        start_time = time.perf_counter()
+        rules = self.rules
+        if side == 1:
+            own_mask, opponent_mask = first_mask, second_mask
+        else:
+            own_mask, opponent_mask = second_mask, first_mask
+
+        best_move = None
+        if self.opening_book is not None and rules.is_placing(first_mask | second_mask):
+            cell = self.opening_book.probe_masks(first_mask, second_mask)[1]
+            best_move = (None, cell)
+            stats.nodes = 1
+        else:
+            best_score = -WIN_SCORE - 1
+            alpha = -WIN_SCORE - 1
+            for move in self.ordered_moves(own_mask, opponent_mask, side):
+                score = self.score_move(own_mask, opponent_mask, side, move, self.max_depth, alpha, WIN_SCORE + 1, 0)
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+                alpha = max(alpha, score)
+            stats.depth = self.max_depth
+            stats.iterations = 1
+        stats.elapsed = time.perf_counter() - start_time
+        return best_move
+
+    def ordered_moves(self, own_mask: int, opponent_mask: int, side: int) -> Sequence[Move]:
+        """
+        Legal moves, those that win at once first
+        """
+        moves = self.rules.legal_moves(own_mask, opponent_mask)
+        winning = [move for move in moves if self.winner_after(own_mask, opponent_mask, side, move) == side]
+        if not winning:
+            return moves
+        return winning + [move for move in moves if move not in winning]
+
+    def winner_after(self, own_mask: int, opponent_mask: int, side: int, move: Move) -> Optional[int]:
+        new_own_mask = self.play(own_mask, move)
+        if side == 1:
+            return self.rules.winner_of(new_own_mask, opponent_mask)
+        return self.rules.winner_of(opponent_mask, new_own_mask)
+
+    @staticmethod
+    def play(own_mask: int, move: Move) -> int:
+        from_index, to_index = move
+        if from_index is None:
+            return own_mask | 1 << to_index
+        return own_mask ^ (1 << from_index | 1 << to_index)
+
+    def score_move(self, own_mask: int, opponent_mask: int, side: int, move: Move,
+                   depth: int, alpha: int, beta: int, ply: int) -> int:
+        """
+        Score of a move for the side playing it, searching depth plies in total
+        """
+        winner = self.winner_after(own_mask, opponent_mask, side, move)
+        if winner:
+            # Quicker wins and slower losses score better
+            return WIN_SCORE - ply - 1 if winner == side else -(WIN_SCORE - ply - 1)
+        return -self.negamax(opponent_mask, self.play(own_mask, move), 3 - side, depth - 1, -beta, -alpha, ply + 1)
+
+    def negamax(self, own_mask: int, opponent_mask: int, side: int, depth: int, alpha: int, beta: int,
+                ply: int) -> int:
+        """
+        Score of the position for side, to move with own_mask
+        """
+        self.stats.nodes += 1
+        moves = self.ordered_moves(own_mask, opponent_mask, side)
+        if not moves:
+            # A blocked player loses
+            return -(WIN_SCORE - ply)
+        if depth == 0:
+            return self.evaluate(own_mask, opponent_mask)
+
+        best_score = -WIN_SCORE - 1
+        for move in moves:
+            score = self.score_move(own_mask, opponent_mask, side, move, depth, alpha, beta, ply)
+            if score > best_score:
+                best_score = score
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.stats.cutoffs += 1
+                break
+        return best_score
+
+    def evaluate(self, own_mask: int, opponent_mask: int) -> int:
+        """
+        Heuristic score for the side to move with own_mask: lines still open
+        to each player, weighted by the pieces already on them, and the center
+        """
+        score = 0
+        for line in LINE_MASKS:
+            own_on_line = own_mask & line
+            opponent_on_line = opponent_mask & line
+            if not opponent_on_line:
+                score += OPEN_LINE_SCORES[POPCOUNT[own_on_line]]
+            if not own_on_line:
+                score -= OPEN_LINE_SCORES[POPCOUNT[opponent_on_line]]
+        if own_mask & CENTER_BIT:
+            score += 3
+        elif opponent_mask & CENTER_BIT:
+            score -= 3
+        return score
@@ -0,0 +1,239 @@
+"""
+Engine server: keeps the engines loaded and answers move requests, one JSON
+object per line, on stdin/stdout or on a localhost TCP socket.
+
+    python engine_server.py
+    python engine_server.py --port 8765 --workers 4
+
+Request:
+    {"id": 7, "board": "111000222", "player": 1, "engine": "minimax", "difficulty": "hard", "time_limit": 0.05}
+    board:      9 digits, row by row (0 = empty, 1 and 2 = players)
+    engine:     minimax, astar or tablebase (default: minimax)
+    difficulty: easy, medium or hard, or expert for minimax (default: medium)
+    time_limit: seconds per move instead of the difficulty's fixed depth (optional)
+Response:
+    {"id": 7, "move": [1, 4], "nodes": 1234, "elapsed_ms": 3.2}
+    move:       [from_index, to_index] with index = row * 3 + col, null without a legal move
+or, for a malformed request:
+    {"id": 7, "error": "..."}
+
+Requests are pipelined: each one is searched on the worker pool as soon as
+its line arrives, and responses are written as searches finish, so they may
+come back out of order (match them by id). Every worker process keeps its
+engines, and their transposition tables, between requests.
+"""
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+
+from engines import ENGINE_TYPES, check_engine
+from game_logic import cell_index
+from tablebase import load_tablebase
+
+DEFAULT_PORT = 8765
+
+# Engines of a worker process by (engine type, difficulty), kept between requests
+_engines: Dict[Tuple[str, str], object] = {}
+
+
+def decode_request(line: str) -> dict:
+    """
+    Decode one request line
+    Raises: ValueError if it is not a JSON object
+    """
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as error:
+        raise ValueError(f"invalid JSON: {error.msg}") from None
+    if not isinstance(request, dict):
+        raise ValueError("a request must be a JSON object")
+    return request
+
+
+def validate_request(request: dict) -> None:
+    """
+    Check a decoded request and fill in its defaults
+    Raises: ValueError describing the first problem found
+    """
+    board = request.get('board')
+    if not isinstance(board, str) or len(board) != 9 or set(board) - set('012'):
+        raise ValueError("board must be 9 digits among 0, 1 and 2")
+    # type() rather than isinstance(): True and False are ints too
+    if type(request.get('player')) is not int or request['player'] not in (1, 2):
+        raise ValueError("player must be 1 or 2")
+    request.setdefault('engine', 'minimax')
+    request.setdefault('difficulty', 'medium')
+    check_engine(request['engine'], request['difficulty'])
+    time_limit = request.get('time_limit')
+    if time_limit is not None and (not isinstance(time_limit, (int, float)) or time_limit <= 0):
+        raise ValueError("time_limit must be a positive number of seconds")
+
+
+def warm_up() -> None:
+    """
+    Map the tablebase in a worker process
+    """
+    load_tablebase()
+
+
+def search(board: str, player: int, engine_type: str, difficulty: str, time_limit: Optional[float]) -> dict:
+    """
+    Run one search in a worker process with its warm engine
+    Returns: the response fields other than the id
+    """
+    engine = _engines.get((engine_type, difficulty))
+    if engine is None:
+        engine = _engines[(engine_type, difficulty)] = ENGINE_TYPES[engine_type](difficulty)
+
+    cells = [int(cell) for cell in board]
+    rows = [cells[row * 3:row * 3 + 3] for row in range(3)]
+    if engine_type == 'tablebase':
+        move, stats = engine.get_best_move(rows, player, return_stats=True)
+    else:
+        move, stats = engine.get_best_move(rows, player, time_limit=time_limit, return_stats=True)
+
+    return {
+        'move': None if move is None else [cell_index(*move[0]), cell_index(*move[1])],
+        'nodes': stats.nodes,
+        'elapsed_ms': round(stats.elapsed * 1000, 3),
+    }
+
+
+class Connection:
+    """
+    One client: the function writing its response lines, its requests still
+    being answered and, on a game host, the sessions it created
+    """
+    __slots__ = ('write_line', 'pending', 'sessions')
+
+    def __init__(self, write_line):
+        self.write_line = write_line
+        self.pending: Set[asyncio.Task] = set()
+        self.sessions: Dict[int, object] = {}
+
+
+class EngineServer:
+    """
+    Dispatches request lines to a process pool and writes each response
+    line to its connection as soon as its search finishes
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        # Start the workers before any socket is opened: processes forked
+        # later would inherit the sockets and keep closed connections open
+        self.executor.submit(warm_up).result()
+
+    def submit(self, line: str, connection: Connection) -> None:
+        """
+        Start answering one request line; the task stays in connection.pending until answered
+        """
+        if not line.strip():
+            return
+        task = asyncio.ensure_future(self.answer(line, connection))
+        connection.pending.add(task)
+        task.add_done_callback(connection.pending.discard)
+
+    async def answer(self, line: str, connection: Connection) -> None:
+        request_id = None
+        try:
+            request = decode_request(line)
+            request_id = request.get('id')
+            validate_request(request)
+            response = await asyncio.get_running_loop().run_in_executor(
+                self.executor, search, request['board'], request['player'], request['engine'],
+                request['difficulty'], request.get('time_limit'))
+            response = {'id': request_id, **response}
+        except ValueError as error:
+            response = {'id': request_id, 'error': str(error)}
+        except Exception as error:
+            # A failed search still gets an answer, the server keeps running
+            response = {'id': request_id, 'error': f"search failed: {error!r}"}
+        connection.write_line(json.dumps(response))
+
+    async def serve(self, reader: asyncio.StreamReader, connection: Connection) -> None:
+        """
+        Answer the request lines of one client until it closes its side,
+        then forget everything it left behind
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.submit(line.decode(), connection)
+            # The client may half-close its side and still read the answers
+            if connection.pending:
+                await asyncio.wait(connection.pending)
+        finally:
+            connection.sessions.clear()
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+
+async def serve_stdio(server: EngineServer) -> None:
+    """
+    Answer the requests read from stdin on stdout until stdin is closed
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    def write_line(text: str) -> None:
+        sys.stdout.write(text + "\n")
+        sys.stdout.flush()
+
+    await server.serve(reader, Connection(write_line))
+
+
+async def serve_tcp(server: EngineServer, host: str, port: int) -> None:
+    """
+    Answer the requests of every client connected to host:port
+    """
+    async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        def write_line(text: str) -> None:
+            if not writer.is_closing():
+                writer.write(text.encode() + b"\n")
+
+        try:
+            await server.serve(reader, Connection(write_line))
+            await writer.drain()
+        finally:
+            writer.close()
+
+    tcp_server = await asyncio.start_server(handle_client, host, port)
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve engine moves over a JSON line protocol")
+    parser.add_argument("--port", type=int, default=None,
+                        help=f"listen on this localhost port (e.g. {DEFAULT_PORT}) instead of stdin/stdout")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on with --port")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    # Build the table once before the workers map it
+    load_tablebase()
+    server = EngineServer(args.workers)
+    # Stop on SIGTERM as on Ctrl+C, shutting the workers down
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if args.port is None:
+            asyncio.run(serve_stdio(server))
+        else:
+            asyncio.run(serve_tcp(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Engines of the fixed-start rules by name, shared by the arena, the engine
+server and the game host.
+
+Every engine takes a difficulty, but not every engine knows every
+difficulty: only minimax searches deep enough for 'expert', so an engine
+is created only with a difficulty listed for it in ENGINE_DIFFICULTIES.
+"""
+from typing import Dict, Tuple
+
+from ai import ThreeMensMorrisAI
+from ai_astar import ThreeMensMorrisAStar
+from tablebase import ThreeMensMorrisTablebase
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+ENGINE_TYPES = {
+    'minimax': ThreeMensMorrisAI,
+    'astar': ThreeMensMorrisAStar,
+    'tablebase': ThreeMensMorrisTablebase,
+}
+ENGINE_DIFFICULTIES: Dict[str, Tuple[str, ...]] = {
+    'minimax': DIFFICULTIES + ('expert',),
+    'astar': DIFFICULTIES,
+    'tablebase': DIFFICULTIES,
+}
+
+
+def check_engine(engine_type: str, difficulty: str) -> None:
+    """
+    Raises: ValueError if engine_type is unknown or does not play at difficulty
+    """
+    if engine_type not in ENGINE_TYPES:
+        raise ValueError(f"engine must be one of {', '.join(sorted(ENGINE_TYPES))}")
+    if difficulty not in ENGINE_DIFFICULTIES[engine_type]:
+        raise ValueError(f"difficulty of {engine_type} must be one of {', '.join(ENGINE_DIFFICULTIES[engine_type])}")
@@ -1,8 +1,14 @@
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from ai import ThreeMensMorrisAI
 from ai_astar import ThreeMensMorrisAStar
+from engine_core import FIXED_START_RULES
+from game_logic import cell_index
+from game_record import HUMAN, GameRecord, append_game, record_path
+from game_state import GameHistory
+from tablebase import ThreeMensMorrisTablebase
 
 # Initialisation de Pygame
 pygame.init()
@@ -13,6 +19,7 @@ LINE_WIDTH = 5
 BOARD_ROWS, BOARD_COLS = 3, 3
 CELL_SIZE = 150  # Adjusted for new layout
 PION_RADIUS = CELL_SIZE // 3
+FPS = 60  # Images par seconde pendant une animation
 
 # Couleurs
 WHITE = (255, 255, 255)
@@ -34,6 +41,89 @@ screen.fill(BG_COLOR)
 
 # Police
 FONT = pygame.font.Font(None, 36)
+SMALL_FONT = pygame.font.Font(None, 24)
+
+# Thread de calcul de l'IA: la recherche ne bloque plus la boucle d'affichage
+AI_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai")
+# Événement posté par le thread de l'IA quand une recherche se termine
+AI_DONE_EVENT = pygame.USEREVENT + 1
+
+# Liste des connexions pour le rendu visuel
+VISUAL_CONNECTIONS = [
+    # Connexions horizontales
+    ((0, 0), (0, 1)), ((0, 1), (0, 2)),
+    ((1, 0), (1, 1)), ((1, 1), (1, 2)),
+    ((2, 0), (2, 1)), ((2, 1), (2, 2)),
+
+    # Connexions verticales
+    ((0, 0), (1, 0)), ((1, 0), (2, 0)),
+    ((0, 1), (1, 1)), ((1, 1), (2, 1)),
+    ((0, 2), (1, 2)), ((1, 2), (2, 2)),
+
+    # Connexions diagonales en X
+    ((0, 0), (1, 1)), ((1, 1), (2, 2)),
+    ((0, 2), (1, 1)), ((1, 1), (2, 0))
+]
+
+# Zones de l'écran redessinées indépendamment (rendu par rectangles modifiés)
+CELL_RECTS = [
+    [pygame.Rect(50 + col * CELL_SIZE, 50 + row * CELL_SIZE, CELL_SIZE, CELL_SIZE) for col in range(BOARD_COLS)]
+    for row in range(BOARD_ROWS)
+]
+STATUS_RECT = pygame.Rect(600, 40, 400, 75)
+SCORE_RECT = pygame.Rect(600, 340, 400, 120)
+RESULT_RECT = pygame.Rect(600, 462, 400, 36)
+STATS_RECT = pygame.Rect(600, 615, 400, 85)
+
+# Surfaces de texte déjà rendues, par (police, texte, couleur)
+TEXT_CACHE = {}
+TEXT_CACHE_SIZE = 256
+
+
+def cell_center(row, col):
+    return 50 + col * CELL_SIZE + CELL_SIZE // 2, 50 + row * CELL_SIZE + CELL_SIZE // 2
+
+
+def render_text(font, text, color):
+    """Render a string once and reuse its surface until the string changes."""
+    key = (font, text, color)
+    surface = TEXT_CACHE.get(key)
+    if surface is None:
+        if len(TEXT_CACHE) >= TEXT_CACHE_SIZE:
+            del TEXT_CACHE[next(iter(TEXT_CACHE))]
+        surface = TEXT_CACHE[key] = font.render(text, True, color)
+    return surface
+
+
+def notify_ai_done(future):
+    """Wake the main loop up when a search finishes (runs on the AI thread)."""
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(AI_DONE_EVENT))
+
+
+def create_background():
+    """Pre-render everything that never changes: board, connections, sidebar panel."""
+    background = pygame.Surface((WIDTH, HEIGHT)).convert()
+    background.fill(BG_COLOR)
+
+    # Dessiner le plateau de jeu (zone principale)
+    pygame.draw.rect(background, (220, 220, 210), (50, 50, 450, 450), border_radius=10)
+
+    # Dessiner les points (intersections) où les pions peuvent être placés
+    for row in range(BOARD_ROWS):
+        for col in range(BOARD_COLS):
+            pygame.draw.circle(background, BLACK, cell_center(row, col), 8)
+
+    # Dessiner les lignes de connexion
+    for start, end in VISUAL_CONNECTIONS:
+        pygame.draw.line(background, LINE_COLOR, cell_center(*start), cell_center(*end), LINE_WIDTH // 2)
+
+    # Panneau latéral
+    pygame.draw.rect(background, SIDEBAR_COLOR, (600, 0, 400, HEIGHT))
+    return background
+
+
+BACKGROUND = create_background()
 
 class Button:
     def __init__(self, x, y, width, height, text, action):
@@ -47,7 +137,7 @@ class Button:
         pygame.draw.rect(screen, color, self.rect, border_radius=8)
         pygame.draw.rect(screen, (50, 50, 50), self.rect, 2, border_radius=8)
 
-        text_surf = FONT.render(self.text, True, BUTTON_TEXT_COLOR)
+        text_surf = render_text(FONT, self.text, BUTTON_TEXT_COLOR)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
 
@@ -62,27 +152,13 @@ class Button:
 
 class Game:
     def __init__(self):
-        # Plateau de jeu: 0 = vide, 1 = joueur 1, 2 = joueur 2
-        self.board = [[0 for _ in range(BOARD_COLS)] for _ in range(BOARD_ROWS)]
-
-        # Initialisation des positions de départ
-        # Joueur 1 (rouge) en haut
-        self.board[0][0] = 1
-        self.board[0][1] = 1
-        self.board[0][2] = 1
-
-        # Joueur 2 (bleu) en bas
-        self.board[2][0] = 2
-        self.board[2][1] = 2
-        self.board[2][2] = 2
-
-        self.player = 1  # Joueur 1 commence
-        self.game_over = False
-        self.winner = None
+        # Position de départ: joueur 1 (rouge) en haut, joueur 2 (bleu) en bas, joueur 1 commence
+        # Historique de la partie: annuler/rétablir et nulle par répétition
+        self.history = GameHistory(FIXED_START_RULES.start_state())
+        self.set_state(self.history.current)
         self.selected_piece = None
         self.valid_moves = []
         self.score = {1: 0, 2: 0}  # Score tracking
-        self.phase = "moving"  # Game phase tracking
 
         # AI settings
         self.ai_enabled = False
@@ -90,27 +166,18 @@ class Game:
         self.ai_type = 'astar'  # Changed default to astar
         self.ai_difficulty = 'easy'  # Changed default to easy
         self.ai = None
+        self.ai_future = None  # Recherche en cours sur le thread de l'IA
+        self.ai_stats = None  # Statistiques de la dernière recherche (SearchStats)
         self.update_ai()
 
         # Définition des mouvements valides pour chaque position
         self.valid_connections = self.create_valid_connections()
 
         # Liste des connexions pour le rendu visuel
-        self.visual_connections = [
-            # Connexions horizontales
-            ((0, 0), (0, 1)), ((0, 1), (0, 2)),
-            ((1, 0), (1, 1)), ((1, 1), (1, 2)),
-            ((2, 0), (2, 1)), ((2, 1), (2, 2)),
-
-            # Connexions verticales
-            ((0, 0), (1, 0)), ((1, 0), (2, 0)),
-            ((0, 1), (1, 1)), ((1, 1), (2, 1)),
-            ((0, 2), (1, 2)), ((1, 2), (2, 2)),
-
-            # Connexions diagonales en X
-            ((0, 0), (1, 1)), ((1, 1), (2, 2)),
-            ((0, 2), (1, 1)), ((1, 1), (2, 0))
-        ]
+        self.visual_connections = VISUAL_CONNECTIONS
+
+        # Contenu affiché de chaque zone de l'écran; vide = tout redessiner
+        self.drawn = {}
 
         # Boutons
         button_width = 300
@@ -170,70 +237,51 @@ class Game:
         return connections
 
     def draw_board(self):
-        # Fond
-        screen.fill(BG_COLOR)
-
-        # Dessiner le plateau de jeu (zone principale)
-        pygame.draw.rect(screen, (220, 220, 210), (50, 50, 450, 450), border_radius=10)
-
-        # Dessiner les points (intersections) où les pions peuvent être placés
+        """Redraw the screen areas whose content changed and return their rectangles."""
+        dirty = []
+        if not self.drawn:
+            # Premier affichage: tout le fond pré-rendu
+            screen.blit(BACKGROUND, (0, 0))
+            dirty.append(screen.get_rect())
+
+        # Cases du plateau: pion, sélection et mouvement valide
         for row in range(BOARD_ROWS):
             for col in range(BOARD_COLS):
-                center_x = 50 + col * CELL_SIZE + CELL_SIZE // 2
-                center_y = 50 + row * CELL_SIZE + CELL_SIZE // 2
-                pygame.draw.circle(screen, BLACK, (center_x, center_y), 8)
-
-        # Dessiner les lignes de connexion
-        for start, end in self.visual_connections:
-            start_row, start_col = start
-            end_row, end_col = end
-
-            start_x = 50 + start_col * CELL_SIZE + CELL_SIZE // 2
-            start_y = 50 + start_row * CELL_SIZE + CELL_SIZE // 2
-            end_x = 50 + end_col * CELL_SIZE + CELL_SIZE // 2
-            end_y = 50 + end_row * CELL_SIZE + CELL_SIZE // 2
-
-            pygame.draw.line(
-                screen,
-                LINE_COLOR,
-                (start_x, start_y),
-                (end_x, end_y),
-                LINE_WIDTH // 2
-            )
-
-        # Dessiner les pions
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                center_x = 50 + col * CELL_SIZE + CELL_SIZE // 2
-                center_y = 50 + row * CELL_SIZE + CELL_SIZE // 2
+                content = (self.board[row][col], self.selected_piece == (row, col), (row, col) in self.valid_moves)
+                if self.region_changed(('cell', row, col), CELL_RECTS[row][col], content, dirty):
+                    self.draw_cell(row, col, *content)
 
-                if self.board[row][col] == 1:
-                    color = RED
-                    pygame.draw.circle(screen, color, (center_x, center_y), PION_RADIUS)
-                elif self.board[row][col] == 2:
-                    color = BLUE
-                    pygame.draw.circle(screen, color, (center_x, center_y), PION_RADIUS)
+        # Dessiner la barre latérale
+        self.draw_sidebar(dirty)
+        return dirty
+
+    def region_changed(self, name, rect, content, dirty):
+        """Restore the background of a screen area if its content changed."""
+        if self.drawn.get(name) == content:
+            return False
+        self.drawn[name] = content
+        screen.blit(BACKGROUND, rect, rect)
+        dirty.append(rect)
+        return True
+
+    def draw_cell(self, row, col, piece, selected, valid_move):
+        center = cell_center(row, col)
+
+        # Dessiner le pion
+        if piece == 1:
+            pygame.draw.circle(screen, RED, center, PION_RADIUS)
+        elif piece == 2:
+            pygame.draw.circle(screen, BLUE, center, PION_RADIUS)
 
         # Surbrillance de la pièce sélectionnée
-        if self.selected_piece:
-            row, col = self.selected_piece
-            center_x = 50 + col * CELL_SIZE + CELL_SIZE // 2
-            center_y = 50 + row * CELL_SIZE + CELL_SIZE // 2
-            pygame.draw.circle(screen, HIGHLIGHT_COLOR, (center_x, center_y), PION_RADIUS + 5, 5)
+        if selected:
+            pygame.draw.circle(screen, HIGHLIGHT_COLOR, center, PION_RADIUS + 5, 5)
 
         # Afficher les mouvements valides
-        for row, col in self.valid_moves:
-            center_x = 50 + col * CELL_SIZE + CELL_SIZE // 2
-            center_y = 50 + row * CELL_SIZE + CELL_SIZE // 2
-            pygame.draw.circle(screen, HIGHLIGHT_COLOR, (center_x, center_y), 10)
-
-        # Dessiner la barre latérale
-        self.draw_sidebar()
-
-    def draw_sidebar(self):
-        # Panneau latéral
-        pygame.draw.rect(screen, SIDEBAR_COLOR, (600, 0, 400, HEIGHT))
+        if valid_move:
+            pygame.draw.circle(screen, HIGHLIGHT_COLOR, center, 10)
 
+    def draw_sidebar(self, dirty):
         # Tour du joueur
         if not self.game_over:
             player_text = f"Tour: Joueur {self.player}"
@@ -242,31 +290,33 @@ class Game:
             player_text = "Partie terminée"
             color_indicator = (100, 100, 100)
 
-        text_surf = FONT.render(player_text, True, BLACK)
-        screen.blit(text_surf, (620, 50))
-        pygame.draw.circle(screen, color_indicator, (700, 90), 20)
-
-        # AI control buttons
-        self.ai_toggle_button.draw()
-        self.ai_type_button.draw()
-        self.difficulty_button.draw()
+        # Indicateur de réflexion de l'IA
+        thinking_text = None
+        if self.ai_thinking():
+            thinking_text = "IA réfléchit" + "." * (pygame.time.get_ticks() // 300 % 4)
 
-        # Score
-        score_text = "Score:"
-        text_surf = FONT.render(score_text, True, BLACK)
-        screen.blit(text_surf, (620, 350))
+        if self.region_changed('status', STATUS_RECT, (player_text, color_indicator, thinking_text), dirty):
+            screen.blit(render_text(FONT, player_text, BLACK), (620, 50))
+            pygame.draw.circle(screen, color_indicator, (700, 90), 20)
+            if thinking_text:
+                screen.blit(render_text(FONT, thinking_text, BLACK), (740, 78))
 
-        # Score Joueur 1 (Rouge)
-        score1_text = f"Joueur 1 (Rouge): {self.score[1]}"
-        text_surf = FONT.render(score1_text, True, RED)
-        screen.blit(text_surf, (620, 390))
+        # AI control buttons and control buttons
+        for button in (self.ai_toggle_button, self.ai_type_button, self.difficulty_button,
+                       self.reset_button, self.quit_button):
+            if self.region_changed(('button', button.rect.y), button.rect, (button.text, button.hover), dirty):
+                button.draw()
 
-        # Score Joueur 2 (Bleu)
-        score2_text = f"Joueur 2 (Bleu): {self.score[2]}"
-        text_surf = FONT.render(score2_text, True, BLUE)
-        screen.blit(text_surf, (620, 430))
+        # Score
+        if self.region_changed('score', SCORE_RECT, (self.score[1], self.score[2]), dirty):
+            screen.blit(render_text(FONT, "Score:", BLACK), (620, 350))
+            # Score Joueur 1 (Rouge)
+            screen.blit(render_text(FONT, f"Joueur 1 (Rouge): {self.score[1]}", RED), (620, 390))
+            # Score Joueur 2 (Bleu)
+            screen.blit(render_text(FONT, f"Joueur 2 (Bleu): {self.score[2]}", BLUE), (620, 430))
 
         # Message de victoire
+        winner_text = winner_color = None
         if self.game_over:
             if self.winner:
                 winner_text = f"Joueur {self.winner} a gagné!"
@@ -274,12 +324,24 @@ class Game:
             else:
                 winner_text = "Match nul!"
                 winner_color = BLACK
-            text_surf = FONT.render(winner_text, True, winner_color)
-            screen.blit(text_surf, (620, 470))
-
-        # Draw control buttons
-        self.reset_button.draw()
-        self.quit_button.draw()
+        if self.region_changed('result', RESULT_RECT, winner_text, dirty) and winner_text:
+            screen.blit(render_text(FONT, winner_text, winner_color), (620, 470))
+
+        # Statistiques de la dernière recherche de l'IA
+        lines = self.ai_stats_lines() if self.ai_stats else []
+        if self.region_changed('stats', STATS_RECT, tuple(lines), dirty):
+            for i, line in enumerate(lines):
+                screen.blit(render_text(SMALL_FONT, line, BLACK), (620, 625 + i * 25))
+
+    def ai_stats_lines(self):
+        """Describe the last AI search in two sidebar lines."""
+        stats = self.ai_stats
+        first = f"IA {stats.engine}: {stats.nodes} nœuds en {stats.elapsed * 1000:.1f} ms"
+        if stats.engine == 'astar':
+            second = f"{stats.expanded} états, {stats.heap_pushes} empilés, prof. {stats.depth}"
+        else:
+            second = f"Profondeur: {stats.depth}, coupures: {stats.cutoffs}"
+        return [first, second]
 
     def get_row_col_from_mouse(self, mouse_pos):
         x, y = mouse_pos
@@ -301,46 +363,69 @@ class Game:
 
         return valid
 
-    def check_win(self):
-        # Vérifier si tous les pions du joueur 1 sont sur la première ligne (bord initial)
-        player1_on_start_row = True
-        for col in range(BOARD_COLS):
-            if self.board[0][col] != 1:
-                player1_on_start_row = False
-                break
-
-        # Si tous les pions du joueur 1 sont sur sa ligne de départ, il ne peut pas gagner
-        if player1_on_start_row:
-            return None
+    def set_state(self, state):
+        """Show a GameState: the board, the player to move and the result follow it."""
+        # État immuable de la partie: une copie n'est qu'une référence
+        self.state = state
+        # Plateau de jeu: 0 = vide, 1 = joueur 1, 2 = joueur 2
+        self.board = state.to_board()
+        self.player = state.side
+        self.phase = state.phase
+        self.winner = state.winner
+        self.game_over = state.winner is not None
+
+    def play_move(self, start, end):
+        """Move the piece of the player to move from start to end, (row, col) cells."""
+        # Lève ValueError si le coup est illégal; un joueur bloqué perd la partie,
+        # une position répétée REPETITION_LIMIT fois donne match nul
+        state = FIXED_START_RULES.play_state(self.state, (cell_index(*start), cell_index(*end)))
+        self.set_state(self.history.push(state))
+        if self.winner:
+            self.score[self.winner] += 1
+        if self.game_over:
+            self.record_game()
 
-        # Vérifier si tous les pions du joueur 2 sont sur la dernière ligne (bord initial)
-        player2_on_start_row = True
-        for col in range(BOARD_COLS):
-            if self.board[2][col] != 2:
-                player2_on_start_row = False
+    def record_game(self):
+        """Append the finished game to the record file named by TMM_RECORD, if any (game_record.py)."""
+        path = record_path()
+        if path is None:
+            return
+        engines = [HUMAN, HUMAN]
+        if self.ai_enabled:
+            # Minimax en Hard joue avec la table de fin de partie: c'est elle qu'on enregistre
+            ai_type = 'tablebase' if isinstance(self.ai, ThreeMensMorrisTablebase) else self.ai_type
+            engines[self.ai_player - 1] = f"{ai_type}/{self.ai_difficulty}"
+        try:
+            append_game(GameRecord.from_history(FIXED_START_RULES, self.history, tuple(engines)), path)
+        except (OSError, ValueError) as error:
+            print(f"Partie non enregistrée: {error}", file=sys.stderr)
+
+    def undo_move(self):
+        """Take back the last move; against the AI, go back to the human player's turn."""
+        self.cancel_ai_move()
+        while self.history.can_undo():
+            if self.winner:
+                self.score[self.winner] -= 1
+            self.set_state(self.history.undo())
+            if not (self.ai_enabled and self.player == self.ai_player):
                 break
+        self.selected_piece = None
+        self.valid_moves = []
+        self.make_ai_move()
 
-        # Si tous les pions du joueur 2 sont sur sa ligne de départ, il ne peut pas gagner
-        if player2_on_start_row:
-            return None
-
-        # Vérifier les lignes
-        for row in range(BOARD_ROWS):
-            if self.board[row][0] != 0 and self.board[row][0] == self.board[row][1] == self.board[row][2]:
-                return self.board[row][0]
-
-        # Vérifier les colonnes
-        for col in range(BOARD_COLS):
-            if self.board[0][col] != 0 and self.board[0][col] == self.board[1][col] == self.board[2][col]:
-                return self.board[0][col]
-
-        # Vérifier les diagonales
-        if self.board[0][0] != 0 and self.board[0][0] == self.board[1][1] == self.board[2][2]:
-            return self.board[0][0]
-        if self.board[0][2] != 0 and self.board[0][2] == self.board[1][1] == self.board[2][0]:
-            return self.board[0][2]
-
-        return None
+    def redo_move(self):
+        """Replay the last undone move; against the AI, its answer too."""
+        self.cancel_ai_move()
+        while self.history.can_redo():
+            self.set_state(self.history.redo())
+            if self.winner:
+                self.score[self.winner] += 1
+            if self.game_over or not (self.ai_enabled and self.player == self.ai_player):
+                break
+        self.selected_piece = None
+        self.valid_moves = []
+        # Coup de l'IA qui n'avait pas été joué avant l'annulation
+        self.make_ai_move()
 
     def handle_click(self, mouse_pos):
         # Create a mouse button down event
@@ -348,7 +433,6 @@ class Game:
 
         # Handle AI control buttons first
         if self.ai_toggle_button.handle_event(mouse_event):
-            print("AI toggle button clicked")  # Debug print
             return
         if self.ai_type_button.handle_event(mouse_event):
             return
@@ -361,8 +445,8 @@ class Game:
         if self.quit_button.handle_event(mouse_event):
             return
 
-        # If the game is over, don't allow moves
-        if self.game_over:
+        # If the game is over or the AI is thinking, don't allow moves
+        if self.game_over or self.ai_thinking():
             return
 
         # Convert mouse position to board coordinates
@@ -376,25 +460,14 @@ class Game:
         # If a piece is already selected, try to move it
         if self.selected_piece:
             if (row, col) in self.valid_moves:
-                # Move the piece
-                old_row, old_col = self.selected_piece
-                self.board[row][col] = self.board[old_row][old_col]
-                self.board[old_row][old_col] = 0
+                # Move the piece, which switches players or ends the game
+                self.play_move(self.selected_piece, (row, col))
                 self.selected_piece = None
                 self.valid_moves = []
 
-                # Check for win
-                winner = self.check_win()
-                if winner:
-                    self.game_over = True
-                    self.winner = winner
-                    self.score[winner] += 1
-                else:
-                    self.player = 3 - self.player  # Switch players
-                    
-                    # If AI is enabled and it's AI's turn, make AI move
-                    if self.ai_enabled and self.player == self.ai_player:
-                        self.make_ai_move()
+                # If AI is enabled and it's AI's turn, make AI move
+                if not self.game_over and self.ai_enabled and self.player == self.ai_player:
+                    self.make_ai_move()
             else:
                 # If clicking on another piece of the same player, select it
                 if 0 <= row < BOARD_ROWS and 0 <= col < BOARD_COLS:
@@ -412,24 +485,16 @@ class Game:
                     self.valid_moves = self.get_valid_moves(row, col)
 
     def reset(self):
-        # Save current settings
-        current_score = self.score.copy()
-        current_ai_enabled = self.ai_enabled
-        current_ai_type = self.ai_type
-        current_ai_difficulty = self.ai_difficulty
-        
-        # Reset the game
-        self.__init__()
-        
-        # Restore settings
-        self.score = current_score
-        self.ai_enabled = current_ai_enabled
-        self.ai_type = current_ai_type
-        self.ai_difficulty = current_ai_difficulty
-        self.ai_toggle_button.text = "AI: ON" if self.ai_enabled else "AI: OFF"
-        self.ai_type_button.text = f"AI: {self.ai_type.capitalize()}"
-        self.difficulty_button.text = f"Difficulty: {self.ai_difficulty.capitalize()}"
-        self.update_ai()
+        # Abandonner la recherche de l'IA en cours
+        self.cancel_ai_move()
+
+        # Reset the game; the score and the AI settings are kept
+        self.history = GameHistory(FIXED_START_RULES.start_state())
+        self.set_state(self.history.current)
+        self.selected_piece = None
+        self.valid_moves = []
+        self.ai_stats = None
+        self.drawn.clear()
 
         # If AI is enabled and it's AI's turn, make the first move
         if self.ai_enabled and self.player == self.ai_player:
@@ -441,18 +506,19 @@ class Game:
 
     def update_ai(self):
         """Update the AI instance based on current settings."""
-        if self.ai_type == 'minimax':
+        if self.ai_type == 'minimax' and self.ai_difficulty == 'hard':
+            # Jeu parfait lu dans la table précalculée, sans recherche
+            self.ai = ThreeMensMorrisTablebase(self.ai_difficulty)
+        elif self.ai_type == 'minimax':
             self.ai = ThreeMensMorrisAI(self.ai_difficulty)
         else:  # astar
             self.ai = ThreeMensMorrisAStar(self.ai_difficulty)
-        print(f"AI updated: {self.ai_type} with difficulty {self.ai_difficulty}")  # Debug print
 
     def toggle_ai(self):
         """Toggle AI on/off."""
-        print("Toggling AI")  # Debug print
         self.ai_enabled = not self.ai_enabled
         self.ai_toggle_button.text = "AI: ON" if self.ai_enabled else "AI: OFF"
-        print(f"AI enabled: {self.ai_enabled}")  # Debug print
+        self.cancel_ai_move()
         if self.ai_enabled:
             self.reset()  # Reset the game when enabling AI
             # If it's AI's turn, make the first move
@@ -475,100 +541,86 @@ class Game:
         self.difficulty_button.text = f"Difficulty: {self.ai_difficulty.capitalize()}"
         self.update_ai()
 
+        # Relancer la recherche en cours avec la nouvelle difficulté
+        if self.ai_thinking():
+            self.cancel_ai_move()
+            self.make_ai_move()
+
+    def animating(self):
+        """Return True while the screen changes without input (AI thinking indicator)."""
+        return self.ai_thinking()
+
+    def ai_thinking(self):
+        """Return True while an AI search is running."""
+        return self.ai_future is not None
+
+    def cancel_ai_move(self):
+        """Drop the running AI search: its result will be ignored."""
+        if self.ai_future is not None:
+            self.ai_future.cancel()
+            self.ai_future = None
+
     def make_ai_move(self):
-        """Make an AI move."""
+        """Start the AI search for its move without blocking the main loop."""
         if not self.ai_enabled or self.game_over or self.player != self.ai_player:
             return
+        if self.ai_thinking():
+            return
 
-        print(f"\nAI making move with {self.ai_type}")  # Debug print
-        print("Current board state:")  # Debug print
-        for row in self.board:
-            print(row)
-        print(f"AI is player {self.ai_player}")  # Debug print
-        
-        # First verify that the AI has pieces on the board
-        ai_pieces = []
-        for row in range(3):
-            for col in range(3):
-                if self.board[row][col] == self.ai_player:
-                    ai_pieces.append((row, col))
-        
-        if not ai_pieces:
-            print("No AI pieces found on the board!")  # Debug print
+        # Start the search on the AI thread with a copy of the board;
+        # poll_ai_move picks up the result from the main loop
+        board = self.state.to_board()
+        self.ai_future = AI_EXECUTOR.submit(self.ai.get_best_move, board, self.ai_player, return_stats=True)
+        self.ai_future.add_done_callback(notify_ai_done)
+
+    def poll_ai_move(self):
+        """Apply the AI move once its search is done. Called after every batch of events."""
+        future = self.ai_future
+        if future is None or not future.done():
             return
-            
-        print(f"Found AI pieces at: {ai_pieces}")  # Debug print
-        
-        # Get AI's move
-        move = self.ai.get_best_move(self.board, self.ai_player)
+        self.ai_future = None
+        try:
+            move, self.ai_stats = future.result()
+        except Exception as error:
+            print(f"Échec de la recherche de l'IA: {error!r}", file=sys.stderr)
+            return
+        self.apply_ai_move(move)
+
+    def apply_ai_move(self, move):
+        """Check and play a move found by the AI."""
+        if not self.ai_enabled or self.game_over or self.player != self.ai_player:
+            return
+
         if move:
             (from_row, from_col), (to_row, to_col) = move
-            print(f"AI attempting move from ({from_row}, {from_col}) to ({to_row}, {to_col})")  # Debug print
-            
-            # Verify the move is valid
-            if (0 <= from_row < 3 and 0 <= from_col < 3 and 
-                0 <= to_row < 3 and 0 <= to_col < 3 and
-                self.board[from_row][from_col] == self.ai_player and  # Must be AI's piece
-                self.board[to_row][to_col] == 0):  # Must be empty
-                
-                # Verify the move follows game rules
-                is_valid_move = False
-                
-                # Check if it's a diagonal move
-                if from_row != to_row and from_col != to_col:
-                    # Diagonal moves must follow the X pattern
-                    if ((from_row == 0 and from_col == 0 and to_row == 1 and to_col == 1) or
-                        (from_row == 0 and from_col == 2 and to_row == 1 and to_col == 1) or
-                        (from_row == 2 and from_col == 0 and to_row == 1 and to_col == 1) or
-                        (from_row == 2 and from_col == 2 and to_row == 1 and to_col == 1) or
-                        (from_row == 1 and from_col == 1 and to_row == 0 and to_col == 0) or
-                        (from_row == 1 and from_col == 1 and to_row == 0 and to_col == 2) or
-                        (from_row == 1 and from_col == 1 and to_row == 2 and to_col == 0) or
-                        (from_row == 1 and from_col == 1 and to_row == 2 and to_col == 2)):
-                        is_valid_move = True
-                else:
-                    # Horizontal or vertical moves must be to adjacent squares
-                    if abs(from_row - to_row) + abs(from_col - to_col) == 1:
-                        is_valid_move = True
-                
-                if is_valid_move:
-                    # Make the move
-                    self.board[to_row][to_col] = self.board[from_row][from_col]
-                    self.board[from_row][from_col] = 0
-                    
-                    print("Board after AI move:")  # Debug print
-                    for row in self.board:
-                        print(row)
-
-                    # Check for win
-                    winner = self.check_win()
-                    if winner:
-                        self.game_over = True
-                        self.winner = winner
-                        self.score[winner] += 1
-                    else:
-                        self.player = 3 - self.player  # Switch to human player
-                else:
-                    print("Move violates game rules")  # Debug print
-            else:
-                print("Invalid move attempted by AI")  # Debug print
-                print(f"From: ({from_row}, {from_col}) = {self.board[from_row][from_col]}")
-                print(f"To: ({to_row}, {to_col}) = {self.board[to_row][to_col]}")
-                print(f"AI is player {self.ai_player}")  # Debug print
+            try:
+                # Les règles vérifient la pièce, la case d'arrivée et la connexion
+                self.play_move((from_row, from_col), (to_row, to_col))
+            except ValueError as error:
+                print(f"Coup illégal de l'IA ({from_row}, {from_col}) -> ({to_row}, {to_col}): {error}",
+                      file=sys.stderr)
         else:
-            print("AI couldn't find a valid move")  # Debug print
-            print("Current board state when no move found:")  # Debug print
-            for row in self.board:
-                print(row)
+            # Un joueur sans coup a déjà perdu (play_state): cela ne devrait pas arriver
+            print(f"L'IA n'a trouvé aucun coup: {self.state!r}", file=sys.stderr)
 
 
 # Création du jeu
 game = Game()
 
 # Boucle principale
+clock = pygame.time.Clock()
 running = True
 while running:
-    for event in pygame.event.get():
+    if game.animating():
+        # Animation en cours: traiter les événements sans attendre, à FPS images par seconde
+        clock.tick(FPS)
+        events = pygame.event.get()
+    else:
+        # Au repos: dormir jusqu'au prochain événement (entrée, fin de la recherche de l'IA)
+        events = [pygame.event.wait()]
+        events.extend(pygame.event.get())
+
+    for event in events:
         if event.type == pygame.QUIT:
             pygame.quit()
             sys.exit()
@@ -579,12 +631,21 @@ while running:
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_r:  # Touche R pour recommencer
                 game.reset()
+            elif event.key == pygame.K_z:  # Touche Z pour annuler le dernier coup
+                game.undo_move()
+            elif event.key == pygame.K_y:  # Touche Y pour rétablir le coup annulé
+                game.redo_move()
+
+        if event.type == pygame.VIDEOEXPOSE:
+            # Fenêtre découverte: tout redessiner
+            game.drawn.clear()
 
-    # Dessiner le plateau
-    game.draw_board()
+    # Récupérer le coup de l'IA s'il est prêt
+    game.poll_ai_move()
 
-    # Mettre à jour l'affichage
-    pygame.display.update()
+    # Redessiner les zones modifiées
+    dirty_rects = game.draw_board()
 
-    # Limiter la fréquence d'images
-    pygame.time.Clock().tick(60)
\ No newline at end of file
+    # Mettre à jour seulement ces zones de l'affichage
+    if dirty_rects:
+        pygame.display.update(dirty_rects)
@@ -0,0 +1,264 @@
+"""
+Headless game host: runs many games at once, without pygame, for clients
+speaking the JSON line protocol of engine_server.py.
+
+    python game_host.py --port 8766 --workers 4
+
+Every game is a small Session object holding an immutable GameState;
+moves are checked and applied with the rules of engine_core.py, and AI
+turns are searched on the worker pool while the host keeps serving the
+other sessions.
+
+A session belongs to the connection that created it: other clients cannot
+reach it, and it is dropped when that connection closes.
+
+Requests (an optional "id" is echoed in the response):
+    {"op": "new", "rules": "fixed-start", "ai": 2, "engine": "minimax", "difficulty": "medium"}
+        rules:  fixed-start (game.py) or place-and-move (main.py), default fixed-start
+        ai:     side played by the host (1 or 2), null for two remote players
+        engine: minimax, astar or tablebase for fixed-start rules, core for both
+        difficulty: easy, medium or hard, or expert for minimax (default: medium)
+    {"op": "move", "session": 3, "from": 1, "to": 4}
+        from is null for a placement; the AI reply, if any, is played before answering
+    {"op": "state", "session": 3}
+    {"op": "close", "session": 3}
+    A move whose AI reply fails is taken back, and the response is an error.
+Responses:
+    {"id": ..., "session": 3, "rules": "fixed-start", "board": "111000222", "side": 1,
+     "phase": "moving", "winner": null, "plies": 0}
+    board: 9 digits, row by row (0 = empty, 1 and 2 = players)
+    winner: 1 or 2, 0 for a draw (third occurrence of a position), null while the game goes on
+or {"id": ..., "error": "..."}
+"""
+import argparse
+import asyncio
+import json
+import signal
+from typing import Dict, Optional, Tuple
+
+from engine_core import FIXED_START_RULES, PLACE_AND_MOVE_RULES, FlatEngine, Move, Rules
+from engine_server import Connection, EngineServer, decode_request, serve_stdio, serve_tcp
+from game_logic import cell_index
+from engines import DIFFICULTIES, ENGINE_TYPES, check_engine
+from game_state import GameHistory, GameState
+from opening_book import ThreeMensMorrisOpeningBook, load_opening_book
+from tablebase import load_tablebase
+
+DEFAULT_PORT = 8766
+
+RULES: Dict[str, Rules] = {rules.name: rules for rules in (FIXED_START_RULES, PLACE_AND_MOVE_RULES)}
+CORE_ENGINE = 'core'
+
+# Engines of a worker process by (rules, engine type, difficulty), kept between AI turns
+_engines: Dict[Tuple[str, str, str], object] = {}
+
+
+def choose_move(rules_name: str, state: GameState, engine_type: str, difficulty: str) -> Optional[Move]:
+    """
+    Search the move of the side to move in a worker process
+    Returns: (from_index or None, to_index), None without a legal move
+    """
+    key = (rules_name, engine_type, difficulty)
+    engine = _engines.get(key)
+    if engine_type == CORE_ENGINE:
+        if engine is None:
+            rules = RULES[rules_name]
+            book = ThreeMensMorrisOpeningBook() if rules is PLACE_AND_MOVE_RULES and difficulty == 'hard' else None
+            engine = _engines[key] = FlatEngine(rules, difficulty, book)
+        return engine.get_best_move_state(state)
+
+    if engine is None:
+        engine = _engines[key] = ENGINE_TYPES[engine_type](difficulty)
+    move = engine.get_best_move(state.to_board(), state.side)
+    if move is None:
+        return None
+    return cell_index(*move[0]), cell_index(*move[1])
+
+
+def is_cell_index(value) -> bool:
+    return type(value) is int and 0 <= value < 9
+
+
+class Session:
+    """
+    One game: its rules, the history of its GameStates and the host's
+    settings; the rules object is shared by every session playing them
+    """
+    __slots__ = ('rules', 'history', 'ai_side', 'engine_type', 'difficulty', 'thinking')
+
+    def __init__(self, rules: Rules, ai_side: Optional[int], engine_type: str, difficulty: str):
+        self.rules = rules
+        # Repeated positions end the game as a draw
+        self.history = GameHistory(rules.start_state())
+        self.ai_side = ai_side
+        self.engine_type = engine_type
+        self.difficulty = difficulty
+        # True while the AI searches its move on the worker pool
+        self.thinking = False
+
+    def play(self, move: Move) -> None:
+        """
+        Play a move of the side to move
+        Raises: ValueError if the game is over or the move is illegal
+        """
+        self.history.push(self.rules.play_state(self.state, move))
+
+    def take_back(self) -> None:
+        """
+        Undo the last move for good, leaving nothing to redo
+        """
+        self.history.undo()
+        self.history.redo_states.clear()
+
+    @property
+    def state(self) -> GameState:
+        return self.history.current
+
+    def to_dict(self) -> dict:
+        state = self.state
+        return {
+            'rules': self.rules.name,
+            'board': state.cells(),
+            'side': state.side,
+            'phase': state.phase,
+            'winner': state.winner,
+            'plies': self.history.plies,
+        }
+
+
+class GameHost(EngineServer):
+    """
+    Answers the request lines of every client, whose sessions live in its
+    Connection; the worker pool and the serving loops are those of the engine server
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        super().__init__(workers)
+        self.next_session_id = 1
+
+    async def answer(self, line: str, connection: Connection) -> None:
+        request_id = None
+        try:
+            request = decode_request(line)
+            request_id = request.get('id')
+            response = await self.handle(request, connection.sessions)
+        except ValueError as error:
+            response = {'error': str(error)}
+        except Exception as error:
+            # A failed AI turn still gets an answer, the host keeps running
+            response = {'error': f"request failed: {error!r}"}
+        connection.write_line(json.dumps({'id': request_id, **response}))
+
+    async def handle(self, request: dict, sessions: Dict[int, Session]) -> dict:
+        """
+        Run one request on the sessions of its connection
+        Returns: the response fields other than the id
+        Raises: ValueError for a malformed or illegal request
+        """
+        op = request.get('op')
+        if op == 'new':
+            session_id, session = self.new_session(request)
+            sessions[session_id] = session
+            try:
+                await self.play_ai_turn(session)
+            except Exception:
+                # The client never learns the id of a session whose first AI move failed
+                del sessions[session_id]
+                raise
+        elif op in ('move', 'state', 'close'):
+            session_id = request.get('session')
+            session = sessions.get(session_id)
+            if session is None:
+                raise ValueError(f"unknown session {session_id!r}")
+            if op == 'close':
+                del sessions[session_id]
+                return {'session': session_id, 'closed': True}
+            if op == 'move':
+                if session.thinking or session.state.side == session.ai_side:
+                    raise ValueError("not your turn")
+                session.play(self.parse_move(request))
+                try:
+                    await self.play_ai_turn(session)
+                except Exception:
+                    # The request fails as a whole: the client sees the state it played on
+                    session.take_back()
+                    raise
+            else:
+                await self.play_ai_turn(session)
+        else:
+            raise ValueError("op must be one of new, move, state, close")
+
+        return {'session': session_id, **session.to_dict()}
+
+    def new_session(self, request: dict) -> Tuple[int, Session]:
+        rules = RULES.get(request.get('rules', FIXED_START_RULES.name))
+        if rules is None:
+            raise ValueError(f"rules must be one of {', '.join(RULES)}")
+        ai_side = request.get('ai')
+        if ai_side is not None and (type(ai_side) is not int or ai_side not in (1, 2)):
+            raise ValueError("ai must be 1, 2 or null")
+        engine_type = request.get('engine', 'minimax' if rules is FIXED_START_RULES else CORE_ENGINE)
+        if engine_type != CORE_ENGINE and (engine_type not in ENGINE_TYPES or rules is not FIXED_START_RULES):
+            raise ValueError(f"engine must be {CORE_ENGINE}"
+                             + (f" or one of {', '.join(sorted(ENGINE_TYPES))}" if rules is FIXED_START_RULES else ""))
+        difficulty = request.get('difficulty', 'medium')
+        if engine_type != CORE_ENGINE:
+            check_engine(engine_type, difficulty)
+        elif difficulty not in DIFFICULTIES:
+            raise ValueError(f"difficulty of {CORE_ENGINE} must be one of {', '.join(DIFFICULTIES)}")
+
+        session_id = self.next_session_id
+        self.next_session_id += 1
+        return session_id, Session(rules, ai_side, engine_type, difficulty)
+
+    @staticmethod
+    def parse_move(request: dict) -> Move:
+        from_index, to_index = request.get('from'), request.get('to')
+        if not (from_index is None or is_cell_index(from_index)) or not is_cell_index(to_index):
+            raise ValueError("from must be a cell index (0-8) or null and to a cell index")
+        return from_index, to_index
+
+    async def play_ai_turn(self, session: Session) -> None:
+        """
+        Search and play the host's move when it is the AI's turn
+        """
+        state = session.state
+        if state.game_over or session.thinking or state.side != session.ai_side:
+            return
+        session.thinking = True
+        try:
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.executor, choose_move, session.rules.name, state, session.engine_type, session.difficulty)
+        finally:
+            session.thinking = False
+        if move is not None:
+            session.play(move)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many headless games over a JSON line protocol")
+    parser.add_argument("--port", type=int, default=None,
+                        help=f"listen on this localhost port (e.g. {DEFAULT_PORT}) instead of stdin/stdout")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on with --port")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    # Build the tables once before the workers map them
+    load_tablebase()
+    load_opening_book()
+    host = GameHost(args.workers)
+    # Stop on SIGTERM as on Ctrl+C, shutting the workers down
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if args.port is None:
+            asyncio.run(serve_stdio(host))
+        else:
+            asyncio.run(serve_tcp(host, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from itertools import combinations
 from typing import List, Tuple, Dict
 
 def create_valid_connections() -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
@@ -68,20 +69,263 @@ def is_winning_state(board: List[List[int]], player: int) -> bool:
     """
     Check if the current board state is a winning state for the given player
     """
-    # Check rows
-    for row in range(3):
-        if all(board[row][col] == player for col in range(3)):
-            return True
+    return WINNING_MASKS[player_mask(board, player)]
 
-    # Check columns
-    for col in range(3):
-        if all(board[row][col] == player for row in range(3)):
-            return True
 
-    # Check diagonals
-    if all(board[i][i] == player for i in range(3)):
-        return True
-    if all(board[i][2-i] == player for i in range(3)):
-        return True
+# ---------------------------------------------------------------------------
+# Bitboard engine
+#
+# Cells are numbered row by row (index = row * 3 + col). The pieces of one
+# player are stored as a 9-bit mask where bit i is set when the player
+# occupies cell i. Every table below is indexed by such a mask or by a cell
+# index, so move generation and win detection never walk the 3x3 lists.
+# ---------------------------------------------------------------------------
 
-    return False 
\ No newline at end of file
+BOARD_CELLS = 9
+FULL_MASK = (1 << BOARD_CELLS) - 1
+
+# (row, col) of every cell index
+CELL_POSITIONS: Tuple[Tuple[int, int], ...] = tuple(divmod(index, 3) for index in range(BOARD_CELLS))
+
+# The 8 winning lines: rows, columns, then both diagonals
+LINE_MASKS: Tuple[int, ...] = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+
+def cell_index(row: int, col: int) -> int:
+    """
+    Convert board coordinates to a cell index
+    """
+    return row * 3 + col
+
+
+def _build_neighbors() -> Tuple[Tuple[int, ...], ...]:
+    """
+    Neighbor cell indices of every cell, in create_valid_connections() order
+    """
+    connections = create_valid_connections()
+    return tuple(
+        tuple(cell_index(row, col) for row, col in connections[CELL_POSITIONS[index]])
+        for index in range(BOARD_CELLS)
+    )
+
+
+# Neighbor cells of every cell, in the order of create_valid_connections()
+NEIGHBORS = _build_neighbors()
+
+# Adjacency of every cell as a mask of its neighbors
+ADJACENCY_MASKS: Tuple[int, ...] = tuple(
+    sum(1 << neighbor for neighbor in neighbors) for neighbors in NEIGHBORS
+)
+
+# Cell indices set in a mask, in ascending order
+MASK_CELLS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(index for index in range(BOARD_CELLS) if mask >> index & 1)
+    for mask in range(FULL_MASK + 1)
+)
+
+# Number of pieces in a mask
+POPCOUNT: Tuple[int, ...] = tuple(len(cells) for cells in MASK_CELLS)
+
+# True when a mask contains one of the 8 winning lines
+WINNING_MASKS: Tuple[bool, ...] = tuple(
+    any(mask & line == line for line in LINE_MASKS) for mask in range(FULL_MASK + 1)
+)
+
+
+# Base-3 state encoding: cell 0 is the most significant digit, so comparing
+# two codes orders them like comparing the 3x3 lists they come from.
+# TRIT_VALUES[mask] is the code of a mask whose cells all hold the digit 1.
+TRIT_VALUES: Tuple[int, ...] = tuple(
+    sum(3 ** (BOARD_CELLS - 1 - index) for index in cells) for cells in MASK_CELLS
+)
+STATE_COUNT = 3 ** BOARD_CELLS
+
+
+def encode_masks(player1_mask: int, player2_mask: int) -> int:
+    """
+    Base-3 integer code of a position given as bitboards
+    """
+    return TRIT_VALUES[player1_mask] + 2 * TRIT_VALUES[player2_mask]
+
+
+def encode_board(board: List[List[int]]) -> int:
+    """
+    Base-3 integer code of a board
+    """
+    code = 0
+    for row in board:
+        for cell in row:
+            code = code * 3 + cell
+    return code
+
+
+def player_mask(board: List[List[int]], player: int) -> int:
+    """
+    Get the bitboard of the given player's pieces
+    """
+    mask = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == player:
+                mask |= bit
+            bit <<= 1
+    return mask
+
+
+def board_to_masks(board: List[List[int]]) -> Tuple[int, int]:
+    """
+    Convert a board to the bitboards of player 1 and player 2
+    """
+    return player_mask(board, 1), player_mask(board, 2)
+
+
+def masks_to_board(player1_mask: int, player2_mask: int) -> List[List[int]]:
+    """
+    Convert the bitboards of both players back to a 3x3 board
+    """
+    board = [[0 for _ in range(3)] for _ in range(3)]
+    for index in MASK_CELLS[player1_mask]:
+        row, col = CELL_POSITIONS[index]
+        board[row][col] = 1
+    for index in MASK_CELLS[player2_mask]:
+        row, col = CELL_POSITIONS[index]
+        board[row][col] = 2
+    return board
+
+
+def is_winning_mask(mask: int) -> bool:
+    """
+    Check if a player's bitboard contains a complete line
+    """
+    return WINNING_MASKS[mask]
+
+
+# Neighbor cells of every cell in ascending order
+SORTED_NEIGHBORS: Tuple[Tuple[int, ...], ...] = tuple(MASK_CELLS[mask] for mask in ADJACENCY_MASKS)
+
+# Legal moves of a position keyed by own_mask << 9 | occupied_mask, with the
+# to cells of each piece in ascending order (MOVES) or in the order of
+# create_valid_connections() (CONNECTION_MOVES). Every position with 3 pieces
+# per player is filled at import, other positions when first asked for.
+MOVES: Dict[int, Tuple[Tuple[int, int], ...]] = {}
+CONNECTION_MOVES: Dict[int, Tuple[Tuple[int, int], ...]] = {}
+
+
+def _generate_moves(own_mask: int, occupied_mask: int, neighbors) -> Tuple[Tuple[int, int], ...]:
+    return tuple(
+        (from_index, to_index)
+        for from_index in MASK_CELLS[own_mask]
+        for to_index in neighbors[from_index]
+        if not occupied_mask >> to_index & 1
+    )
+
+
+def _fill_move_caches() -> None:
+    for own_cells in combinations(range(BOARD_CELLS), 3):
+        own_mask = sum(1 << index for index in own_cells)
+        remaining = [index for index in range(BOARD_CELLS) if index not in own_cells]
+        for opponent_cells in combinations(remaining, 3):
+            occupied_mask = own_mask | sum(1 << index for index in opponent_cells)
+            key = own_mask << BOARD_CELLS | occupied_mask
+            MOVES[key] = _generate_moves(own_mask, occupied_mask, SORTED_NEIGHBORS)
+            CONNECTION_MOVES[key] = _generate_moves(own_mask, occupied_mask, NEIGHBORS)
+
+
+_fill_move_caches()
+
+
+def get_mask_moves(own_mask: int, occupied_mask: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    Get all valid moves for the pieces in own_mask, from the move cache
+    Returns: Tuple of (from_index, to_index) tuples, both in ascending order
+    """
+    key = own_mask << BOARD_CELLS | occupied_mask
+    moves = MOVES.get(key)
+    if moves is None:
+        moves = MOVES[key] = _generate_moves(own_mask, occupied_mask, SORTED_NEIGHBORS)
+    return moves
+
+
+def get_connection_moves(own_mask: int, occupied_mask: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    Get all valid moves for the pieces in own_mask, from the move cache
+    Returns: Tuple of (from_index, to_index) tuples, from cells ascending and
+    to cells in create_valid_connections() order
+    """
+    key = own_mask << BOARD_CELLS | occupied_mask
+    moves = CONNECTION_MOVES.get(key)
+    if moves is None:
+        moves = CONNECTION_MOVES[key] = _generate_moves(own_mask, occupied_mask, NEIGHBORS)
+    return moves
+
+
+def count_mask_moves(own_mask: int, occupied_mask: int) -> int:
+    """
+    Mobility: number of valid moves for the pieces in own_mask
+    """
+    return len(get_mask_moves(own_mask, occupied_mask))
+
+
+# Starting rows of the fixed-start game: player 1 on top, player 2 at the bottom
+START_ROW_MASKS = {1: LINE_MASKS[0], 2: LINE_MASKS[2]}
+
+
+def create_start_board() -> List[List[int]]:
+    """
+    Create the board of the fixed-start game: player 1 on the top row, player 2 on the bottom row
+    """
+    return masks_to_board(START_ROW_MASKS[1], START_ROW_MASKS[2])
+
+
+def get_mask_winner(player1_mask: int, player2_mask: int):
+    """
+    Get the winner of a position given as bitboards, following the fixed-start rules:
+    nobody wins while a player still has all its pieces on its starting row
+    Returns: 1, 2 or None
+    """
+    if player1_mask & START_ROW_MASKS[1] == START_ROW_MASKS[1]:
+        return None
+    if player2_mask & START_ROW_MASKS[2] == START_ROW_MASKS[2]:
+        return None
+
+    # Rows, columns then diagonals, as Game.check_win always did
+    for line in LINE_MASKS:
+        if player1_mask & line == line:
+            return 1
+        if player2_mask & line == line:
+            return 2
+    return None
+
+
+def get_line_winner(player1_mask: int, player2_mask: int):
+    """
+    Get the winner of a position given as bitboards under the rules of main.py,
+    where any complete line wins (no start rows)
+    Returns: 1, 2 or None
+    """
+    # Same order as WINNING_COMBINATIONS in main.py
+    for line in LINE_MASKS:
+        if player1_mask & line == line:
+            return 1
+        if player2_mask & line == line:
+            return 2
+    return None
+
+
+def get_winner(board: List[List[int]]):
+    """
+    Get the winner of the board following the fixed-start rules
+    Returns: 1, 2 or None
+    """
+    return get_mask_winner(*board_to_masks(board))
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside an engine search when its time budget runs out
+    """
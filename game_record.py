@@ -0,0 +1,233 @@
+"""
+Compact binary records of played games, for both games (game.py and main.py).
+
+Recording is off unless the TMM_RECORD environment variable names a record
+file, e.g. TMM_RECORD=~/games.tmmr python game.py.
+
+A record file is a small file header followed by games appended one after
+the other, so a writer streams finished games to the end of the file and a
+reader walks them through a memory map without loading the file.
+
+File format (little endian):
+    file header: magic b"TMMR", version (uint8)
+    then, for every game:
+        rules (uint8): index in RULES (0 = fixed-start, 1 = place-and-move)
+        side (uint8): side to move in the start position (1 or 2)
+        board (uint32): start position, GameState.board (player1_mask | player2_mask << 9)
+        result (uint8): 1 or 2 = winner, 0 = draw, 255 = unfinished
+        move count (uint16)
+        engines: for player 1 then player 2, a name length (uint8) and the UTF-8 name
+                 ("human", "tablebase/hard", ...)
+        moves: 1 byte each, from_index * 9 + to_index, or 81 + to_index for a placement
+"""
+import mmap
+import os
+import struct
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from engine_core import FIXED_START_RULES, PLACE_AND_MOVE_RULES, Move, Rules
+from game_logic import BOARD_CELLS, MASK_CELLS
+from game_state import PLACING, GameHistory, GameState
+
+MAGIC = b"TMMR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sB")
+GAME_HEADER = struct.Struct("<BBIBH")
+
+# Environment variable naming the file the games record their games in
+RECORD_ENV = "TMM_RECORD"
+
+RULES: Tuple[Rules, ...] = (FIXED_START_RULES, PLACE_AND_MOVE_RULES)
+UNFINISHED = 255
+PLACEMENT_CODE = BOARD_CELLS * BOARD_CELLS
+HUMAN = "human"
+
+# Move of every code, and code of every move
+MOVES_BY_CODE: Tuple[Move, ...] = tuple(
+    divmod(code, BOARD_CELLS) for code in range(PLACEMENT_CODE)
+) + tuple((None, to_index) for to_index in range(BOARD_CELLS))
+MOVE_CODES = {move: code for code, move in enumerate(MOVES_BY_CODE)}
+
+
+def record_path() -> Optional[str]:
+    """
+    Record file named by TMM_RECORD (~ expanded), None if games are not recorded
+    """
+    path = os.environ.get(RECORD_ENV)
+    return os.path.expanduser(path) if path else None
+
+
+def move_between(before: GameState, after: GameState) -> Move:
+    """
+    Move of the side to move in before that leads to after
+    """
+    if before.side == 1:
+        old_mask, new_mask = before.player1_mask, after.player1_mask
+    else:
+        old_mask, new_mask = before.player2_mask, after.player2_mask
+    from_cells = MASK_CELLS[old_mask & ~new_mask]
+    return (from_cells[0] if from_cells else None), MASK_CELLS[new_mask & ~old_mask][0]
+
+
+class GameRecord:
+    """
+    One game: its rules, start state, moves, result (1, 2, 0 for a draw,
+    None if unfinished) and the engine names of player 1 and player 2
+    """
+    __slots__ = ('rules', 'start', 'moves', 'result', 'engines')
+
+    def __init__(self, rules: Rules, start: GameState, moves: Sequence[Move], result: Optional[int] = None,
+                 engines: Tuple[str, str] = (HUMAN, HUMAN)):
+        self.rules = rules
+        self.start = start
+        self.moves = moves
+        self.result = result
+        self.engines = engines
+
+    @classmethod
+    def from_history(cls, rules: Rules, history: GameHistory,
+                     engines: Tuple[str, str] = (HUMAN, HUMAN)) -> "GameRecord":
+        """
+        Record of the states played in a history (undone moves left out)
+        """
+        states = history.states
+        moves = [move_between(states[ply], states[ply + 1]) for ply in range(len(states) - 1)]
+        return cls(rules, states[0], moves, history.current.winner, engines)
+
+    def states(self) -> Iterator[GameState]:
+        """
+        Replay the game: the start state, then the state after every move
+        (a draw by repetition shows in result, not in the last state)
+        """
+        state = self.start
+        yield state
+        for move in self.moves:
+            state = self.rules.play_state(state, move)
+            yield state
+
+    def encode(self) -> bytes:
+        result = UNFINISHED if self.result is None else self.result
+        names = b"".join(bytes((len(name),)) + name for name in (engine.encode() for engine in self.engines))
+        return (GAME_HEADER.pack(RULES.index(self.rules), self.start.side, self.start.board, result,
+                                 len(self.moves))
+                + names
+                + bytes(MOVE_CODES[move] for move in self.moves))
+
+    def __repr__(self) -> str:
+        return (f"GameRecord({self.rules.name!r}, {self.start!r}, {len(self.moves)} moves, "
+                f"result={self.result}, engines={self.engines})")
+
+
+def decode_record(data, offset: int) -> Tuple[GameRecord, int]:
+    """
+    Decode the game starting at offset in data (bytes or a memory map)
+    Returns: (record, offset of the next game)
+    Raises: ValueError if the game is cut short or malformed
+    """
+    end = offset + GAME_HEADER.size
+    if end > len(data):
+        raise ValueError(f"truncated game header at offset {offset}")
+    rules_index, side, board, result, move_count = GAME_HEADER.unpack_from(data, offset)
+    if rules_index >= len(RULES):
+        raise ValueError(f"unknown rules {rules_index} at offset {offset}")
+
+    engines: List[str] = []
+    for _ in range(2):
+        if end >= len(data):
+            raise ValueError(f"truncated engine name at offset {offset}")
+        length = data[end]
+        engines.append(bytes(data[end + 1:end + 1 + length]).decode())
+        end += 1 + length
+    moves_end = end + move_count
+    if moves_end > len(data):
+        raise ValueError(f"truncated moves at offset {offset}")
+
+    rules = RULES[rules_index]
+    start = GameState(board, side)
+    if rules.is_placing(start.player1_mask | start.player2_mask):
+        start = GameState(board, side, PLACING)
+    moves = [MOVES_BY_CODE[code] for code in data[end:moves_end]]
+    record = GameRecord(rules, start, moves, None if result == UNFINISHED else result, (engines[0], engines[1]))
+    return record, moves_end
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file as they finish, creating the file with
+    its header if needed; use it as a context manager or call close()
+    """
+
+    def __init__(self, path: str):
+        """
+        Raises: ValueError if path already holds something else than a record file
+        """
+        self.path = path
+        # Checked before opening, so that a foreign file is neither appended to nor left open
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            _check_header(path)
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+    def write(self, record: GameRecord) -> None:
+        self.file.write(record.encode())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def append_game(record: GameRecord, path: str) -> None:
+    """
+    Append one game to a record file
+    """
+    with GameRecordWriter(path) as writer:
+        writer.write(record)
+
+
+def read_games(path: str) -> Iterator[GameRecord]:
+    """
+    Yield the games of a record file one by one, read through a memory map
+    Raises: ValueError if the file is not a record file or ends in the middle of a game
+    """
+    _check_header(path)
+    with open(path, "rb") as record_file:
+        with mmap.mmap(record_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = FILE_HEADER.size
+            while offset < len(data):
+                record, offset = decode_record(data, offset)
+                yield record
+
+
+def _check_header(path: str) -> None:
+    with open(path, "rb") as record_file:
+        header = record_file.read(FILE_HEADER.size)
+    if len(header) != FILE_HEADER.size or FILE_HEADER.unpack(header) != (MAGIC, VERSION):
+        raise ValueError(f"{path} is not a game record file (version {VERSION})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a game record file")
+    parser.add_argument("path", nargs="?", default=record_path(), help=f"path of the record file (default: ${RECORD_ENV})")
+    args = parser.parse_args()
+    if args.path is None:
+        parser.error(f"no record file given and {RECORD_ENV} is not set")
+
+    counts = {}
+    games = plies = 0
+    for game in read_games(args.path):
+        key = (game.rules.name, game.result)
+        counts[key] = counts.get(key, 0) + 1
+        games += 1
+        plies += len(game.moves)
+    print(f"{args.path}: {games} games, {plies} moves, {os.path.getsize(args.path)} bytes")
+    for (rules_name, result), count in sorted(counts.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        outcome = {None: "unfinished", 0: "draw"}.get(result, f"player {result} wins")
+        print(f"  {rules_name:<16}{outcome:<16}{count}")
@@ -0,0 +1,208 @@
+"""
+Immutable game state shared by the games, the engines and the game host.
+
+The whole position fits in one small object: both bitboards packed in a
+single integer (board = player1_mask | player2_mask << 9), the side to
+move (1 or 2), the phase and the winner. A state is never modified: a move
+makes a new state (Rules.play_state in engine_core.py), so a snapshot is
+just a reference, and copying, hashing and comparing take constant time.
+
+GameHistory keeps the states of one game for undo and redo, and counts how
+often each position occurred to end endless games as draws.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from game_logic import BOARD_CELLS, FULL_MASK, board_to_masks, masks_to_board
+
+PLACING = 'placing'
+MOVING = 'moving'
+
+# Winner of a drawn game (1 and 2 are the players, None while the game goes on)
+DRAW = 0
+
+# Occurrences of the same position, same side to move, that draw the game
+REPETITION_LIMIT = 3
+
+
+class GameState:
+    """
+    Position of a game: board, side to move, phase and winner (1, 2, DRAW or None)
+    """
+    __slots__ = ('board', 'side', 'phase', 'winner')
+
+    def __init__(self, board: int, side: int, phase: str = MOVING, winner: Optional[int] = None):
+        object.__setattr__(self, 'board', board)
+        object.__setattr__(self, 'side', side)
+        object.__setattr__(self, 'phase', phase)
+        object.__setattr__(self, 'winner', winner)
+
+    @classmethod
+    def from_masks(cls, player1_mask: int, player2_mask: int, side: int, phase: str = MOVING,
+                   winner: Optional[int] = None) -> "GameState":
+        return cls(player1_mask | player2_mask << BOARD_CELLS, side, phase, winner)
+
+    @classmethod
+    def from_board(cls, board: List[List[int]], side: int, phase: str = MOVING,
+                   winner: Optional[int] = None) -> "GameState":
+        """
+        State of a 3x3 board of game.py (0 = empty, 1 and 2 = players)
+        """
+        return cls.from_masks(*board_to_masks(board), side, phase, winner)
+
+    @property
+    def player1_mask(self) -> int:
+        return self.board & FULL_MASK
+
+    @property
+    def player2_mask(self) -> int:
+        return self.board >> BOARD_CELLS
+
+    def masks(self) -> Tuple[int, int]:
+        """
+        (bitboard of player 1, bitboard of player 2)
+        """
+        return self.board & FULL_MASK, self.board >> BOARD_CELLS
+
+    def own_masks(self) -> Tuple[int, int]:
+        """
+        (bitboard of the side to move, bitboard of the other side)
+        """
+        if self.side == 1:
+            return self.board & FULL_MASK, self.board >> BOARD_CELLS
+        return self.board >> BOARD_CELLS, self.board & FULL_MASK
+
+    def to_board(self) -> List[List[int]]:
+        """
+        New 3x3 board of the position, for the engines working on lists
+        """
+        return masks_to_board(*self.masks())
+
+    def cells(self) -> str:
+        """
+        9 digits, row by row (0 = empty, 1 and 2 = players)
+        """
+        return ''.join(
+            '1' if self.board >> index & 1 else '2' if self.board >> (index + BOARD_CELLS) & 1 else '0'
+            for index in range(BOARD_CELLS)
+        )
+
+    @property
+    def position_key(self) -> int:
+        """
+        Integer identifying the position and the side to move, whatever the result
+        """
+        return self.board << 2 | self.side
+
+    @property
+    def game_over(self) -> bool:
+        return self.winner is not None
+
+    def drawn(self) -> "GameState":
+        """
+        Same position, with the game over as a draw
+        """
+        return GameState(self.board, self.side, self.phase, DRAW)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameState is immutable")
+
+    def __copy__(self) -> "GameState":
+        return self
+
+    def __deepcopy__(self, memo) -> "GameState":
+        return self
+
+    def __reduce__(self):
+        return GameState, (self.board, self.side, self.phase, self.winner)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (self.board == other.board and self.side == other.side
+                and self.phase == other.phase and self.winner == other.winner)
+
+    def __hash__(self) -> int:
+        return hash((self.board, self.side, self.phase, self.winner))
+
+    def __repr__(self) -> str:
+        return f"GameState({self.cells()!r}, side={self.side}, phase={self.phase!r}, winner={self.winner})"
+
+
+class GameHistory:
+    """
+    States of one game, from the start to the current one, with the undone
+    states kept for redo. Undo and redo move one state between two stacks;
+    a hashed counter of position keys detects repetitions.
+    """
+    __slots__ = ('states', 'redo_states', 'counts', 'repetition_limit')
+
+    def __init__(self, start: GameState, repetition_limit: int = REPETITION_LIMIT):
+        self.states: List[GameState] = []
+        self.redo_states: List[GameState] = []
+        # Occurrences of every position key among self.states
+        self.counts: Dict[int, int] = {}
+        self.repetition_limit = repetition_limit
+        self._record(start)
+
+    @property
+    def current(self) -> GameState:
+        return self.states[-1]
+
+    @property
+    def plies(self) -> int:
+        return len(self.states) - 1
+
+    def can_undo(self) -> bool:
+        return len(self.states) > 1
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_states)
+
+    def repetitions(self, state: GameState) -> int:
+        """
+        Times the position of state occurred in the game so far
+        """
+        return self.counts.get(state.position_key, 0)
+
+    def push(self, state: GameState) -> GameState:
+        """
+        Make state the current one after a move; the redo states are dropped
+        Returns: the state recorded, drawn if its position reached the repetition limit
+        """
+        self.redo_states.clear()
+        return self._record(state)
+
+    def undo(self) -> Optional[GameState]:
+        """
+        Go back one move
+        Returns: the new current state, None at the start of the game
+        """
+        if len(self.states) < 2:
+            return None
+        state = self.states.pop()
+        self.counts[state.position_key] -= 1
+        self.redo_states.append(state)
+        return self.states[-1]
+
+    def redo(self) -> Optional[GameState]:
+        """
+        Replay the last undone move
+        Returns: the new current state, None if nothing was undone
+        """
+        if not self.redo_states:
+            return None
+        state = self.redo_states.pop()
+        self.states.append(state)
+        self.counts[state.position_key] = self.counts.get(state.position_key, 0) + 1
+        return state
+
+    def _record(self, state: GameState) -> GameState:
+        key = state.position_key
+        count = self.counts[key] = self.counts.get(key, 0) + 1
+        if count >= self.repetition_limit and state.winner is None:
+            state = state.drawn()
+        self.states.append(state)
+        return state
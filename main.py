@@ -1,5 +1,10 @@
 import pygame
 import math
+import sys
+
+from engine_core import FlatEngine, PLACE_AND_MOVE_RULES
+from game_record import HUMAN, GameRecord, append_game, record_path
+from opening_book import ThreeMensMorrisOpeningBook
 
 # Initialisation de pygame
 pygame.init()
@@ -21,6 +26,20 @@ HIGHLIGHT_COLOR = (120, 255, 120, 150)  # Couleur de surbrillance pour les posit
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Three Men's Morris Amélioré")
 
+# Effets pré-rendus une seule fois, modulés en alpha au moment du blit
+OVERLAY = pygame.Surface((WIDTH, HEIGHT))  # Voile sombre de l'écran de victoire
+OVERLAY.fill((0, 0, 0))
+OVERLAY.set_alpha(128)
+
+SHINE_SPRITE = pygame.Surface((CIRCLE_RADIUS * 2, CIRCLE_RADIUS * 2), pygame.SRCALPHA)  # Éclat des pions animés
+pygame.draw.circle(SHINE_SPRITE, (255, 255, 255), (CIRCLE_RADIUS, CIRCLE_RADIUS), CIRCLE_RADIUS // 2)
+
+MOVE_HIGHLIGHT_SPRITE = pygame.Surface((CIRCLE_RADIUS * 2, CIRCLE_RADIUS * 2), pygame.SRCALPHA)
+pygame.draw.circle(MOVE_HIGHLIGHT_SPRITE, HIGHLIGHT_COLOR, (CIRCLE_RADIUS, CIRCLE_RADIUS), CIRCLE_RADIUS)
+
+glow_sprites = {}  # (combinaison, joueur) -> (sprite de la combinaison gagnante, position)
+text_surfaces = {}  # (texte, couleur) -> surface rendue
+
 # Coordonnées des positions du plateau (9 cases)
 positions = [
     (200, 100), (350, 100), (500, 100),
@@ -37,6 +56,7 @@ WINNING_COMBINATIONS = [
 
 # État du jeu
 board = [None] * 9  # None = case vide, 0 = joueur 1, 1 = joueur 2
+player_masks = [0, 0]  # Cases de chaque joueur en bits (bit i = case i), tenues à jour avec board
 current_player = 0  # Alterne entre 0 (rouge) et 1 (bleu)
 phase = "placing"  # "placing" (placer pions) ou "moving" (déplacer pions)
 selected_piece = None  # Stocke l'index du pion sélectionné
@@ -45,6 +65,13 @@ game_active = True
 score = {0: 0, 1: 0}  # Score pour chaque joueur
 victory_displayed = False  # Indicateur pour éviter les mises à jour multiples du score
 winner = None  # Variable pour stocker le gagnant
+game_moves = []  # Coups de la partie, (départ ou None pour une pose, arrivée), pour l'enregistrer
+
+# IA (joueur bleu)
+AI_PLAYER = 1
+AI_DIFFICULTY = 'hard'
+ai_enabled = False
+ai_engine = None
 
 # Animation
 animations = []  # Liste pour stocker les animations en cours
@@ -117,10 +144,8 @@ class PieceAnimation:
         # Ajouter un petit éclat
         if progress_ratio > 0.8:
             shine_alpha = int(255 * (1 - (progress_ratio - 0.8) / 0.2))
-            shine_surf = pygame.Surface((CIRCLE_RADIUS * 2, CIRCLE_RADIUS * 2), pygame.SRCALPHA)
-            pygame.draw.circle(shine_surf, (255, 255, 255, shine_alpha), (CIRCLE_RADIUS, CIRCLE_RADIUS),
-                               CIRCLE_RADIUS // 2)
-            screen.blit(shine_surf, (int(current_x - CIRCLE_RADIUS), int(current_y - bounce - CIRCLE_RADIUS)))
+            SHINE_SPRITE.set_alpha(shine_alpha)
+            screen.blit(SHINE_SPRITE, (int(current_x - CIRCLE_RADIUS), int(current_y - bounce - CIRCLE_RADIUS)))
 
 
 # Fonction pour créer une animation de mouvement
@@ -180,10 +205,8 @@ def draw_board():
     if selected_piece is not None and phase == "moving":
         possible_moves = get_possible_moves(selected_piece)
         for move_index in possible_moves:
-            # Créer une surface semi-transparente pour la surbrillance
-            highlight_surf = pygame.Surface((CIRCLE_RADIUS * 2, CIRCLE_RADIUS * 2), pygame.SRCALPHA)
-            pygame.draw.circle(highlight_surf, HIGHLIGHT_COLOR, (CIRCLE_RADIUS, CIRCLE_RADIUS), CIRCLE_RADIUS)
-            screen.blit(highlight_surf,
+            # Surbrillance semi-transparente pré-rendue
+            screen.blit(MOVE_HIGHLIGHT_SPRITE,
                         (positions[move_index][0] - CIRCLE_RADIUS, positions[move_index][1] - CIRCLE_RADIUS))
 
             # Dessiner un cercle pulsant
@@ -225,6 +248,10 @@ def draw_board():
         show_winner(winner)
         victory_displayed = True
 
+    # Écran de victoire, redessiné à chaque image tant que la partie est gagnée
+    if victory_displayed:
+        draw_victory_screen(winner)
+
 
 # Fonction pour dessiner l'interface utilisateur
 def draw_ui():
@@ -307,16 +334,42 @@ def show_winner(winner):
 
     # Mettre à jour le score
     score[winner] += 1
-
+    record_game(winner)
+
+
+# Ajoute la partie terminée au fichier des parties nommé par TMM_RECORD, s'il y en a un (game_record.py)
+def record_game(winner):
+    path = record_path()
+    if path is None:
+        return
+    engines = [HUMAN, HUMAN]
+    if ai_enabled:
+        engines[AI_PLAYER] = f"core/{AI_DIFFICULTY}"
+    record = GameRecord(PLACE_AND_MOVE_RULES, PLACE_AND_MOVE_RULES.start_state(), game_moves, winner + 1,
+                        tuple(engines))
+    try:
+        append_game(record, path)
+    except (OSError, ValueError) as error:
+        print(f"Partie non enregistrée: {error}", file=sys.stderr)
+
+
+# Rendu d'un texte, mis en cache tant qu'il ne change pas
+def render_text(text, color):
+    surface = text_surfaces.get((text, color))
+    if surface is None:
+        surface = text_surfaces[(text, color)] = FONT.render(text, True, color)
+    return surface
+
+
+# Dessiner l'écran de victoire
+def draw_victory_screen(winner):
     # Dessiner un panneau de victoire
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 128))
-    screen.blit(overlay, (0, 0))
+    screen.blit(OVERLAY, (0, 0))
 
     message = f"Joueur {winner + 1} gagne !"
     color = PLAYER_COLORS[winner]
 
-    text = FONT.render(message, True, (255, 255, 255))
+    text = render_text(message, (255, 255, 255))
 
     # Créer un panneau de victoire plus grand
     panel_width, panel_height = 400, 200
@@ -330,7 +383,7 @@ def show_winner(winner):
     screen.blit(text, (WIDTH // 2 - text.get_width() // 2, panel_y + 50))
 
     # Ajouter un message supplémentaire
-    subtext = FONT.render("Cliquez sur Nouvelle Partie", True, (200, 200, 200))
+    subtext = render_text("Cliquez sur Nouvelle Partie", (200, 200, 200))
     screen.blit(subtext, (WIDTH // 2 - subtext.get_width() // 2, panel_y + 100))
 
     # Mettre en surbrillance la combinaison gagnante
@@ -342,28 +395,48 @@ def highlight_winning_combination():
     for combo in WINNING_COMBINATIONS:
         a, b, c = combo
         if board[a] is not None and board[a] == board[b] == board[c]:
-            # Dessiner des lignes lumineuses entre les pions gagnants
-            color = PLAYER_COLORS[board[a]]
-            bright_color = (min(color[0] + 70, 255), min(color[1] + 70, 255), min(color[2] + 70, 255))
+            # Lignes et cercles lumineux autour des pions gagnants
+            glow_sprite, glow_pos = get_glow_sprite(combo, board[a])
 
-            for i in range(10):  # Animation clignotante
-                alpha = int(255 * (0.5 + 0.5 * math.sin(pygame.time.get_ticks() / 200)))
-                glow_surf = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+            # Animation clignotante: l'éclat était superposé 10 fois avec
+            # l'opacité alpha, soit une seule fois avec l'opacité cumulée
+            alpha = int(255 * (0.5 + 0.5 * math.sin(pygame.time.get_ticks() / 200)))
+            glow_sprite.set_alpha(int(255 * (1 - (1 - alpha / 255) ** 10)))
+            screen.blit(glow_sprite, glow_pos)
 
-                # Dessiner une ligne épaisse qui brille
-                pygame.draw.line(glow_surf, (*bright_color, alpha),
-                                 positions[a], positions[b], LINE_WIDTH + 6)
-                pygame.draw.line(glow_surf, (*bright_color, alpha),
-                                 positions[b], positions[c], LINE_WIDTH + 6)
+            break
 
-                # Ajouter des cercles brillants autour des pions gagnants
-                for pos_idx in [a, b, c]:
-                    pygame.draw.circle(glow_surf, (*bright_color, alpha),
-                                       positions[pos_idx], CIRCLE_RADIUS + 10, 4)
 
-                screen.blit(glow_surf, (0, 0))
+# Sprite de la combinaison gagnante d'un joueur, créé à la première victoire
+def get_glow_sprite(combo, player):
+    sprite = glow_sprites.get((combo, player))
+    if sprite is not None:
+        return sprite
 
-            break
+    a, b, c = combo
+    color = PLAYER_COLORS[player]
+    bright_color = (min(color[0] + 70, 255), min(color[1] + 70, 255), min(color[2] + 70, 255))
+
+    # Zone couverte par les cercles autour des pions gagnants
+    margin = CIRCLE_RADIUS + 10
+    left = min(positions[i][0] for i in combo) - margin
+    top = min(positions[i][1] for i in combo) - margin
+    width = max(positions[i][0] for i in combo) + margin - left
+    height = max(positions[i][1] for i in combo) + margin - top
+    local = {i: (positions[i][0] - left, positions[i][1] - top) for i in combo}
+
+    glow_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+
+    # Dessiner une ligne épaisse qui brille
+    pygame.draw.line(glow_surf, bright_color, local[a], local[b], LINE_WIDTH + 6)
+    pygame.draw.line(glow_surf, bright_color, local[b], local[c], LINE_WIDTH + 6)
+
+    # Ajouter des cercles brillants autour des pions gagnants
+    for pos_idx in [a, b, c]:
+        pygame.draw.circle(glow_surf, bright_color, local[pos_idx], CIRCLE_RADIUS + 10, 4)
+
+    sprite = glow_sprites[(combo, player)] = (glow_surf, (left, top))
+    return sprite
 
 
 # Vérifie si un joueur a gagné
@@ -376,7 +449,7 @@ def check_winner():
 
 # Gère le clic du joueur
 def handle_click(pos):
-    global current_player, phase, selected_piece, game_active, victory_displayed
+    global selected_piece
 
     # Vérifier si le jeu est actif
     if not game_active:
@@ -386,23 +459,15 @@ def handle_click(pos):
     if animations:
         return False  # Ignorer les clics pendant les animations
 
+    # Le joueur humain ne joue pas à la place de l'IA
+    if ai_enabled and current_player == AI_PLAYER:
+        return False
+
     for i, (x, y) in enumerate(positions):
         if abs(pos[0] - x) < CIRCLE_RADIUS and abs(pos[1] - y) < CIRCLE_RADIUS:
             if phase == "placing":
                 if board[i] is None and len(player_pieces[current_player]) < 3:
-                    board[i] = current_player
-                    player_pieces[current_player].append(i)
-                    create_place_animation(i, current_player)
-
-                    # Vérifier s'il y a un gagnant après le placement
-                    if check_winner() is not None:
-                        return True  # Un mouvement a été fait et il y a un gagnant
-
-                    if len(player_pieces[0]) == 3 and len(player_pieces[1]) == 3:
-                        phase = "moving"
-
-                    current_player = 1 - current_player
-                    return True  # Un mouvement a été fait
+                    return place_piece(i)
                 break
 
             elif phase == "moving":
@@ -412,19 +477,7 @@ def handle_click(pos):
                         return True  # Une sélection a été faite
                 else:
                     if board[i] is None and is_adjacent(selected_piece, i):
-                        create_move_animation(selected_piece, i, current_player)
-                        board[i] = current_player
-                        board[selected_piece] = None
-                        player_pieces[current_player].remove(selected_piece)
-                        player_pieces[current_player].append(i)
-                        selected_piece = None
-
-                        # Vérifier s'il y a un gagnant après le déplacement
-                        if check_winner() is not None:
-                            return True  # Un mouvement a été fait et il y a un gagnant
-
-                        current_player = 1 - current_player
-                        return True  # Un mouvement a été fait
+                        return move_piece(selected_piece, i)
                     elif board[i] == current_player:
                         selected_piece = i  # Sélectionner un autre pion
                         return True  # Une sélection a été faite
@@ -433,6 +486,72 @@ def handle_click(pos):
     return False  # Aucun mouvement n'a été fait
 
 
+# Pose un pion du joueur courant sur la case index
+def place_piece(index):
+    global current_player, phase
+    board[index] = current_player
+    player_masks[current_player] |= 1 << index
+    player_pieces[current_player].append(index)
+    game_moves.append((None, index))
+    create_place_animation(index, current_player)
+
+    # Vérifier s'il y a un gagnant après le placement
+    if check_winner() is not None:
+        return True  # Un mouvement a été fait et il y a un gagnant
+
+    if len(player_pieces[0]) == 3 and len(player_pieces[1]) == 3:
+        phase = "moving"
+
+    current_player = 1 - current_player
+    return True  # Un mouvement a été fait
+
+
+# Déplace un pion du joueur courant de start vers end
+def move_piece(start, end):
+    global current_player, selected_piece
+    create_move_animation(start, end, current_player)
+    board[end] = current_player
+    board[start] = None
+    player_masks[current_player] ^= 1 << start | 1 << end
+    player_pieces[current_player].remove(start)
+    player_pieces[current_player].append(end)
+    game_moves.append((start, end))
+    selected_piece = None
+
+    # Vérifier s'il y a un gagnant après le déplacement
+    if check_winner() is not None:
+        return True  # Un mouvement a été fait et il y a un gagnant
+
+    current_player = 1 - current_player
+    return True  # Un mouvement a été fait
+
+
+# Moteur de l'IA, créé au premier coup qu'elle joue
+def get_ai_engine():
+    global ai_engine
+    if ai_engine is None:
+        ai_engine = FlatEngine(PLACE_AND_MOVE_RULES, AI_DIFFICULTY, ThreeMensMorrisOpeningBook())
+    return ai_engine
+
+
+# Fait jouer l'IA: elle lit directement les masques tenus à jour par place_piece et move_piece
+def play_ai_move():
+    move = get_ai_engine().get_best_move_masks(player_masks[0], player_masks[1], AI_PLAYER + 1)
+    if move is None:
+        return False  # Aucun coup possible
+    start, end = move
+    if start is None:
+        return place_piece(end)
+    return move_piece(start, end)
+
+
+# Active ou désactive l'IA
+def toggle_ai():
+    global ai_enabled
+    ai_enabled = not ai_enabled
+    ai_button.text = "IA: Oui" if ai_enabled else "IA: Non"
+
+
 # Vérifie si deux positions sont adjacentes
 def is_adjacent(start, end):
     return end in adjacent_positions[start]
@@ -440,8 +559,9 @@ def is_adjacent(start, end):
 
 # Réinitialise le jeu après une victoire
 def reset_game():
-    global board, current_player, phase, selected_piece, player_pieces, game_active, victory_displayed, winner
+    global board, player_masks, current_player, phase, selected_piece, player_pieces, game_active, victory_displayed, winner
     board = [None] * 9
+    player_masks = [0, 0]
     current_player = 0
     phase = "placing"
     selected_piece = None
@@ -449,6 +569,7 @@ def reset_game():
     game_active = True
     victory_displayed = False
     winner = None
+    game_moves.clear()
 
     # Effacer toutes les animations
     animations.clear()
@@ -467,8 +588,10 @@ def set_animation_speed(speed):
 
 
 # Définition des boutons
+ai_button = Button(830, 250, 160, 50, "IA: Non", toggle_ai)
 buttons = [
     Button(620, 250, 200, 50, "Nouvelle Partie", reset_game),
+    ai_button,
     Button(620, 320, 160, 50, "Quitter", quit_game),
     Button(830, 320, 160, 50, "Aide", lambda: print("Aide")),  # Bouton Aide (à implémenter)
 ]
@@ -495,9 +618,14 @@ while running:
             if not button_clicked:
                 move_made = handle_click(event.pos)
 
-        # Mise à jour de l'état des boutons (hover)
-        for button in buttons:
-            button.handle_event(event)
+        # Mise à jour de l'état des boutons (hover); les clics sont déjà traités ci-dessus
+        elif event.type == pygame.MOUSEMOTION:
+            for button in buttons:
+                button.handle_event(event)
+
+    # Coup de l'IA une fois les animations du coup précédent terminées
+    if ai_enabled and game_active and current_player == AI_PLAYER and not animations and check_winner() is None:
+        play_ai_move()
 
     # Dessiner le plateau et les pions
     draw_board()
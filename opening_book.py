@@ -0,0 +1,247 @@
+"""
+Opening book for the placing phase of main.py.
+
+main.py starts from an empty board: red (player 0) and blue (player 1)
+drop 3 pieces each, red first, then move them along adjacent_positions,
+which is the graph of create_valid_connections(). Any complete line wins
+and there are no start rows, so all 8 symmetries of the board apply
+(symmetry.BOARD_SYMMETRIES). Every canonical placing position is solved to
+the end of the game. The positions reached by the sixth piece are read
+from a moving-phase table solved with tablebase.solve under these rules,
+red to move. A side to move with no legal move loses.
+
+In masks, player 1 is red (main.py player 0) and player 2 is blue.
+
+File format (little endian):
+    header: magic b"TMMB", version (uint8), pieces per player (uint8), position count (uint16)
+    then, for every canonical placing position in rank order, 2 bytes:
+        value: as in tablebase.py (0 = draw, 1..126 = win in that many plies,
+               128 + n = loss in n plies)
+        move:  cell index of the best placement, 255 if none
+"""
+import mmap
+import os
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+from game_logic import BOARD_CELLS, POPCOUNT, get_line_winner
+from symmetry import BOARD_SYMMETRIES, CELL_PERMUTATIONS, INVERSES, canonical_masks
+from tablebase import (
+    ENTRY_SIZE, HEADER, NO_MOVE, LayoutIndex, choose_move, decode_result, decode_value, encode_result, solve,
+)
+
+MAGIC = b"TMMB"
+VERSION = 1
+PIECES = 3
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+# (red pieces, blue pieces) on the board while placing, red to move when equal
+PLACING_COUNTS = tuple((count - count // 2, count // 2) for count in range(PIECES * 2))
+
+# Layouts of the moving phase under main.py rules
+MAIN_LAYOUTS = LayoutIndex(BOARD_SYMMETRIES)
+
+
+def _enumerate_positions() -> List[Tuple[int, int]]:
+    """
+    Canonical undecided (red_mask, blue_mask) placing positions, in rank order
+    """
+    positions = []
+    for red_count, blue_count in PLACING_COUNTS:
+        for red_cells in combinations(range(BOARD_CELLS), red_count):
+            remaining = [index for index in range(BOARD_CELLS) if index not in red_cells]
+            red_mask = sum(1 << index for index in red_cells)
+            for blue_cells in combinations(remaining, blue_count):
+                blue_mask = sum(1 << index for index in blue_cells)
+                if get_line_winner(red_mask, blue_mask):
+                    continue
+                if canonical_masks(red_mask, blue_mask, BOARD_SYMMETRIES)[:2] == (red_mask, blue_mask):
+                    positions.append((red_mask, blue_mask))
+    return positions
+
+
+POSITIONS = _enumerate_positions()
+POSITION_RANKS: Dict[int, int] = {
+    red_mask << BOARD_CELLS | blue_mask: rank for rank, (red_mask, blue_mask) in enumerate(POSITIONS)
+}
+
+
+def side_to_move(red_mask: int, blue_mask: int) -> int:
+    """
+    1 (red) or 2 (blue): red places first, so blue moves when red has one more piece
+    """
+    return 1 if POPCOUNT[red_mask] == POPCOUNT[blue_mask] else 2
+
+
+def solve_book() -> bytes:
+    """
+    Solve every placing position to the end of the game
+    Returns: the book entries, ENTRY_SIZE bytes per position
+    """
+    moving_table = solve(MAIN_LAYOUTS, get_line_winner)
+    # (is_win, distance) for the side to move, None for a draw, by canonical key
+    results: Dict[int, Optional[Tuple[bool, int]]] = {}
+    entries: Dict[int, bytes] = {}
+
+    # Positions with more pieces first: their successors are solved before them
+    for red_mask, blue_mask in sorted(POSITIONS, key=lambda masks: -POPCOUNT[masks[0] | masks[1]]):
+        player = side_to_move(red_mask, blue_mask)
+        occupied = red_mask | blue_mask
+        moves = []
+        for cell in range(BOARD_CELLS):
+            if occupied >> cell & 1:
+                continue
+            if player == 1:
+                new_red_mask, new_blue_mask = red_mask | 1 << cell, blue_mask
+            else:
+                new_red_mask, new_blue_mask = red_mask, blue_mask | 1 << cell
+            winner = get_line_winner(new_red_mask, new_blue_mask)
+            successor = None
+            if not winner:
+                new_red_mask, new_blue_mask, _ = canonical_masks(new_red_mask, new_blue_mask, BOARD_SYMMETRIES)
+                successor = new_red_mask << BOARD_CELLS | new_blue_mask
+                if POPCOUNT[new_red_mask | new_blue_mask] == PIECES * 2:
+                    # Sixth piece placed: the moving phase starts, red to move
+                    index = MAIN_LAYOUTS.entry_index(new_red_mask, new_blue_mask, 1)
+                    results[successor] = decode_result(moving_table[index * ENTRY_SIZE])
+            moves.append((cell, winner, successor))
+
+        key = red_mask << BOARD_CELLS | blue_mask
+        move = choose_move(moves, results, player)
+        results[key] = _move_result(moves, move, results, player)
+        entries[key] = bytes((encode_result(results[key]), move))
+
+    return b"".join(entries[red_mask << BOARD_CELLS | blue_mask] for red_mask, blue_mask in POSITIONS)
+
+
+def _move_result(moves, chosen_move: int, results, player: int) -> Optional[Tuple[bool, int]]:
+    """
+    Result of a position for the side to move when it plays chosen_move
+    """
+    for move, winner, successor in moves:
+        if move != chosen_move:
+            continue
+        if winner:
+            return (True, 1) if winner == player else (False, 1)
+        result = results[successor]
+        if result is None:
+            return None
+        is_win, distance = result
+        return not is_win, distance + 1
+    return None
+
+
+def build_opening_book(path: str = DEFAULT_PATH) -> None:
+    """
+    Solve the placing phase and write the book to path
+    """
+    book = solve_book()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, VERSION, PIECES, len(POSITIONS)))
+        output.write(book)
+    os.replace(tmp_path, path)
+
+
+_loaded: Dict[str, mmap.mmap] = {}
+
+
+def load_opening_book(path: str = DEFAULT_PATH) -> mmap.mmap:
+    """
+    Memory-map the book, building it first if the file is missing or outdated
+    """
+    book = _loaded.get(path)
+    if book is not None:
+        return book
+
+    if not _is_valid(path):
+        build_opening_book(path)
+    with open(path, "rb") as book_file:
+        book = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+    _loaded[path] = book
+    return book
+
+
+def _is_valid(path: str) -> bool:
+    try:
+        with open(path, "rb") as book_file:
+            header = book_file.read(HEADER.size)
+            book_file.seek(0, os.SEEK_END)
+            size = book_file.tell()
+    except OSError:
+        return False
+    if len(header) != HEADER.size:
+        return False
+    return (HEADER.unpack(header) == (MAGIC, VERSION, PIECES, len(POSITIONS))
+            and size == HEADER.size + len(POSITIONS) * ENTRY_SIZE)
+
+
+def board_masks(board: List[Optional[int]]) -> Tuple[int, int]:
+    """
+    (red_mask, blue_mask) of a main.py board (None = empty, 0 = red, 1 = blue)
+    """
+    red_mask = blue_mask = 0
+    for index, cell in enumerate(board):
+        if cell == 0:
+            red_mask |= 1 << index
+        elif cell == 1:
+            blue_mask |= 1 << index
+    return red_mask, blue_mask
+
+
+class ThreeMensMorrisOpeningBook:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.book = load_opening_book(path)
+
+    def probe_masks(self, red_mask: int, blue_mask: int) -> Tuple[int, int]:
+        """
+        Read the (value, cell) entry of a placing position, the stored
+        placement of the canonical position being mapped back onto it
+        """
+        canonical_red, canonical_blue, symmetry = canonical_masks(red_mask, blue_mask, BOARD_SYMMETRIES)
+        rank = POSITION_RANKS.get(canonical_red << BOARD_CELLS | canonical_blue)
+        if rank is None:
+            raise ValueError("The opening book only covers undecided placing-phase positions")
+        offset = HEADER.size + rank * ENTRY_SIZE
+        value, cell = self.book[offset], self.book[offset + 1]
+        if cell != NO_MOVE:
+            cell = CELL_PERMUTATIONS[INVERSES[symmetry]][cell]
+        return value, cell
+
+    def probe(self, board: List[Optional[int]]) -> Tuple[int, int]:
+        """
+        Read the (value, cell) entry of a main.py board; the side to move
+        follows from the piece counts
+        """
+        return self.probe_masks(*board_masks(board))
+
+    def evaluate(self, board: List[Optional[int]]) -> Tuple[str, int]:
+        """
+        Game-theoretic value of the board for the side to move
+        Returns: ('win' | 'loss' | 'draw', distance in plies)
+        """
+        return decode_value(self.probe(board)[0])
+
+    def get_best_move(self, board: List[Optional[int]]) -> Optional[int]:
+        """
+        Best placement for the side to move
+        Returns: cell index (0-8), None if there is none
+        """
+        cell = self.probe(board)[1]
+        return None if cell == NO_MOVE else cell
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the placing-phase opening book of main.py")
+    parser.add_argument("--output", default=DEFAULT_PATH, help="path of the book file")
+    args = parser.parse_args()
+
+    build_opening_book(args.output)
+    book = ThreeMensMorrisOpeningBook(args.output)
+    kind, distance = book.evaluate([None] * BOARD_CELLS)
+    summary = f"{kind} in {distance} plies" if distance else kind
+    print(f"Wrote {args.output} ({HEADER.size + len(POSITIONS) * ENTRY_SIZE} bytes, "
+          f"{len(POSITIONS)} positions); empty board: {summary}")
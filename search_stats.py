@@ -0,0 +1,47 @@
+"""
+Statistics of one engine search, returned by get_best_move(..., return_stats=True).
+"""
+
+
+class SearchStats:
+    """
+    Work done by one get_best_move call. Counters that do not apply to an
+    engine stay at 0 (alpha-beta cutoffs for A*, heap pushes for minimax).
+    """
+
+    def __init__(self, engine: str, difficulty: str):
+        self.engine = engine
+        self.difficulty = difficulty
+        # Positions visited (minimax nodes, A* heap pops, tablebase reads)
+        self.nodes = 0
+        # Alpha-beta cutoffs
+        self.cutoffs = 0
+        # A* states expanded (size of the closed set, summed over iterations)
+        self.expanded = 0
+        # A* pushes on the open set
+        self.heap_pushes = 0
+        # Minimax depth of the last finished iteration, longest A* path popped
+        self.depth = 0
+        # Finished iterations of an iterative deepening search
+        self.iterations = 0
+        # Transposition table probes during this search
+        self.tt_hits = 0
+        self.tt_misses = 0
+        # True when the time budget interrupted an iteration
+        self.timed_out = False
+        # Wall-clock time of the search in seconds
+        self.elapsed = 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        values = dict(vars(self))
+        values['nodes_per_second'] = self.nodes_per_second
+        return values
+
+    def __repr__(self) -> str:
+        return (f"SearchStats({self.engine}/{self.difficulty}: nodes={self.nodes}, cutoffs={self.cutoffs}, "
+                f"expanded={self.expanded}, heap_pushes={self.heap_pushes}, depth={self.depth}, "
+                f"elapsed={self.elapsed * 1000:.2f} ms)")
@@ -0,0 +1,92 @@
+"""
+Symmetries of the board and canonical position keys.
+
+The connection graph of create_valid_connections() (like the king-move
+graph of main.py) is invariant under the 8 rotations and reflections of the
+square. The start-row rule of get_mask_winner only survives the left-right
+mirror, so positions played under game.py rules are canonicalized with
+GAME_SYMMETRIES, while BOARD_SYMMETRIES applies to rules without start rows.
+
+A symmetry is a cell permutation: CELL_PERMUTATIONS[s][index] is the image
+of a cell under symmetry s and MASK_PERMUTATIONS[s][mask] the image of a
+bitboard. The canonical form of a position is its image with the smallest
+(player1_mask << 9 | player2_mask) key.
+"""
+from typing import Sequence, Tuple
+
+from game_logic import BOARD_CELLS, CELL_POSITIONS, FULL_MASK, MASK_CELLS, cell_index
+
+# Images of (row, col), in the order of the symmetry indices
+_TRANSFORMS = (
+    lambda row, col: (row, col),            # identity
+    lambda row, col: (col, 2 - row),        # quarter turn clockwise
+    lambda row, col: (2 - row, 2 - col),    # half turn
+    lambda row, col: (2 - col, row),        # quarter turn counterclockwise
+    lambda row, col: (row, 2 - col),        # left-right mirror
+    lambda row, col: (2 - row, col),        # top-bottom mirror
+    lambda row, col: (col, row),            # main diagonal
+    lambda row, col: (2 - col, 2 - row),    # anti-diagonal
+)
+
+IDENTITY = 0
+MIRROR = 4
+
+CELL_PERMUTATIONS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(cell_index(*transform(row, col)) for row, col in CELL_POSITIONS) for transform in _TRANSFORMS
+)
+MASK_PERMUTATIONS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(sum(1 << permutation[index] for index in MASK_CELLS[mask]) for mask in range(FULL_MASK + 1))
+    for permutation in CELL_PERMUTATIONS
+)
+# INVERSES[s] undoes symmetry s
+INVERSES: Tuple[int, ...] = tuple(
+    CELL_PERMUTATIONS.index(tuple(permutation.index(index) for index in range(BOARD_CELLS)))
+    for permutation in CELL_PERMUTATIONS
+)
+
+# Symmetries of the game.py rules (start rows), and of the bare board
+GAME_SYMMETRIES: Tuple[int, ...] = (IDENTITY, MIRROR)
+BOARD_SYMMETRIES: Tuple[int, ...] = tuple(range(len(CELL_PERMUTATIONS)))
+
+
+def transform_masks(player1_mask: int, player2_mask: int, symmetry: int) -> Tuple[int, int]:
+    """
+    Image of a position under a symmetry
+    """
+    masks = MASK_PERMUTATIONS[symmetry]
+    return masks[player1_mask], masks[player2_mask]
+
+
+def transform_move(move: Tuple[int, int], symmetry: int) -> Tuple[int, int]:
+    """
+    Image of a (from_index, to_index) move under a symmetry
+    """
+    permutation = CELL_PERMUTATIONS[symmetry]
+    return permutation[move[0]], permutation[move[1]]
+
+
+def canonical_masks(player1_mask: int, player2_mask: int,
+                    symmetries: Sequence[int] = GAME_SYMMETRIES) -> Tuple[int, int, int]:
+    """
+    Canonical representative of a position's symmetry class
+    Returns: (player1_mask, player2_mask, symmetry mapping the position onto it)
+    """
+    best_key = best_symmetry = None
+    for symmetry in symmetries:
+        masks = MASK_PERMUTATIONS[symmetry]
+        key = masks[player1_mask] << BOARD_CELLS | masks[player2_mask]
+        if best_key is None or key < best_key:
+            best_key, best_symmetry = key, symmetry
+    return best_key >> BOARD_CELLS, best_key & FULL_MASK, best_symmetry
+
+
+def canonical_key(player1_mask: int, player2_mask: int, symmetries: Sequence[int] = GAME_SYMMETRIES) -> int:
+    """
+    Integer key shared by every position of a symmetry class
+    """
+    player1_mask, player2_mask, _ = canonical_masks(player1_mask, player2_mask, symmetries)
+    return player1_mask << BOARD_CELLS | player2_mask
+
+
+# MIRROR_CANONICAL[mask]: the smaller of a bitboard and its mirror image
+MIRROR_CANONICAL: Tuple[int, ...] = tuple(min(mask, MASK_PERMUTATIONS[MIRROR][mask]) for mask in range(FULL_MASK + 1))
@@ -0,0 +1,350 @@
+"""
+Perfect-play tablebase for the moving phase of the fixed-start game.
+
+Every layout with 3 pieces per player (9!/(3!*3!*3!) = 1680 of them) is
+solved for both sides to move by retrograde analysis under the rules of
+game.py (get_mask_winner). A side to move with no legal move loses, as in
+the other Morris games.
+
+A layout and its left-right mirror image have the same value, so only the
+canonical layouts (symmetry.canonical_masks) are solved and stored; probes
+canonicalize the board and map the stored move back onto it. solve() also
+takes other rules (a winner function and its symmetries), as used by the
+opening book of main.py.
+
+File format (little endian):
+    header: magic b"TMMT", version (uint8), side count (uint8), layout count (uint16)
+    then, for every canonical layout rank and side to move (player 1 first), 2 bytes:
+        value: 0 = draw, 1..126 = win in that many plies,
+               128 + n = loss in n plies, 255 = game already over
+        move:  from_index * 9 + to_index of the best move, 255 if none
+"""
+import mmap
+import os
+import struct
+import time
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from game_logic import (
+    BOARD_CELLS, CELL_POSITIONS, board_to_masks, get_mask_moves, get_mask_winner,
+)
+from search_stats import SearchStats
+from symmetry import GAME_SYMMETRIES, INVERSES, canonical_masks, transform_move
+
+MAGIC = b"TMMT"
+VERSION = 2
+HEADER = struct.Struct("<4sBBH")
+ENTRY_SIZE = 2
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebase.bin")
+
+DRAW = 0
+LOSS = 128
+TERMINAL = 255
+NO_MOVE = 255
+
+
+class LayoutIndex:
+    """
+    Ranks of the canonical 3 against 3 layouts under a set of symmetries
+    """
+
+    def __init__(self, symmetries: Sequence[int]):
+        self.symmetries = symmetries
+        self.layouts: List[Tuple[int, int]] = []
+        for player1_cells in combinations(range(BOARD_CELLS), 3):
+            remaining = [index for index in range(BOARD_CELLS) if index not in player1_cells]
+            player1_mask = sum(1 << index for index in player1_cells)
+            for player2_cells in combinations(remaining, 3):
+                player2_mask = sum(1 << index for index in player2_cells)
+                if canonical_masks(player1_mask, player2_mask, symmetries)[:2] == (player1_mask, player2_mask):
+                    self.layouts.append((player1_mask, player2_mask))
+        self.ranks: Dict[int, int] = {
+            player1_mask << BOARD_CELLS | player2_mask: rank
+            for rank, (player1_mask, player2_mask) in enumerate(self.layouts)
+        }
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def entry_index(self, player1_mask: int, player2_mask: int, player: int) -> Optional[int]:
+        """
+        Index of a position's canonical form in the table, None if it is not a
+        3 against 3 layout
+        """
+        player1_mask, player2_mask, _ = canonical_masks(player1_mask, player2_mask, self.symmetries)
+        rank = self.ranks.get(player1_mask << BOARD_CELLS | player2_mask)
+        if rank is None:
+            return None
+        return rank * 2 + player - 1
+
+
+# Layouts of the game.py rules, stored in the table file
+GAME_LAYOUTS = LayoutIndex(GAME_SYMMETRIES)
+LAYOUTS = GAME_LAYOUTS.layouts
+LAYOUT_RANKS = GAME_LAYOUTS.ranks
+entry_index = GAME_LAYOUTS.entry_index
+
+
+def _successors(player1_mask: int, player2_mask: int, player: int, index: LayoutIndex,
+                winner_of: Callable[[int, int], Optional[int]]):
+    """
+    Moves of the side to move with their outcome
+    Returns: List of (move, winner after the move, successor entry index)
+    """
+    own_mask = player1_mask if player == 1 else player2_mask
+    successors = []
+    for from_index, to_index in get_mask_moves(own_mask, player1_mask | player2_mask):
+        step = 1 << from_index | 1 << to_index
+        if player == 1:
+            new_player1_mask, new_player2_mask = player1_mask ^ step, player2_mask
+        else:
+            new_player1_mask, new_player2_mask = player1_mask, player2_mask ^ step
+        winner = winner_of(new_player1_mask, new_player2_mask)
+        successor = None if winner else index.entry_index(new_player1_mask, new_player2_mask, 3 - player)
+        successors.append((from_index * BOARD_CELLS + to_index, winner, successor))
+    return successors
+
+
+def solve(layouts: LayoutIndex = GAME_LAYOUTS,
+          winner_of: Callable[[int, int], Optional[int]] = get_mask_winner) -> bytes:
+    """
+    Label every position win, loss or draw with its distance to the end,
+    under the rules given by winner_of (game.py rules by default) and the
+    symmetries of layouts
+    Returns: the table entries, ENTRY_SIZE bytes per position
+    """
+    size = len(layouts) * 2
+    # (is_win, distance) of every solved position
+    results: List[Optional[Tuple[bool, int]]] = [None] * size
+    terminal = [False] * size
+    moves = [[] for _ in range(size)]
+
+    for rank, (player1_mask, player2_mask) in enumerate(layouts.layouts):
+        for player in (1, 2):
+            index = rank * 2 + player - 1
+            if winner_of(player1_mask, player2_mask):
+                terminal[index] = True
+                continue
+            moves[index] = _successors(player1_mask, player2_mask, player, layouts, winner_of)
+            if not moves[index]:
+                results[index] = (False, 0)
+
+    # Positions at distance d only depend on positions at distance d - 1
+    distance = 1
+    while True:
+        solved = {}
+        for index in range(size):
+            if terminal[index] or results[index] is not None:
+                continue
+            all_losing = True
+            for _, winner, successor in moves[index]:
+                if winner:
+                    if winner == index % 2 + 1:
+                        if distance == 1:
+                            solved[index] = (True, 1)
+                            break
+                        continue
+                else:
+                    result = results[successor]
+                    if result is None:
+                        all_losing = False
+                        continue
+                    if not result[0]:
+                        if result[1] == distance - 1:
+                            solved[index] = (True, distance)
+                            break
+                        continue
+            else:
+                # Every move loses (immediately or into a won position for the opponent)
+                if all_losing:
+                    solved[index] = (False, distance)
+        if not solved:
+            break
+        for index, result in solved.items():
+            results[index] = result
+        distance += 1
+
+    table = bytearray(size * ENTRY_SIZE)
+    for index in range(size):
+        if terminal[index]:
+            table[index * 2:index * 2 + 2] = bytes((TERMINAL, NO_MOVE))
+            continue
+        value = encode_result(results[index])
+        table[index * 2:index * 2 + 2] = bytes((value, choose_move(moves[index], results, index % 2 + 1)))
+    return bytes(table)
+
+
+def encode_result(result: Optional[Tuple[bool, int]]) -> int:
+    """
+    Stored value of an (is_win, distance) result, None being a draw
+    """
+    if result is None:
+        return DRAW
+    is_win, distance = result
+    return distance if is_win else LOSS + distance
+
+
+def decode_result(value: int) -> Optional[Tuple[bool, int]]:
+    """
+    (is_win, distance) result of a stored value, None for a draw
+    """
+    if value == DRAW:
+        return None
+    if value >= LOSS:
+        return False, value - LOSS
+    return True, value
+
+
+def choose_move(moves, results, player: int) -> int:
+    """
+    Quickest win, otherwise any draw, otherwise the longest resistance
+    moves: List of (move, winner after the move, key of the successor in results)
+    """
+    best_move = NO_MOVE
+    best_rank = None
+    for move, winner, successor in moves:
+        if winner:
+            # (kind, tie breaker): lower is better
+            rank = (0, 1) if winner == player else (2, -1)
+        else:
+            result = results[successor]
+            if result is None:
+                rank = (1, 0)
+            elif result[0]:
+                rank = (2, -(result[1] + 1))
+            else:
+                rank = (0, result[1] + 1)
+        if best_rank is None or rank < best_rank:
+            best_rank = rank
+            best_move = move
+    return best_move
+
+
+def build_tablebase(path: str = DEFAULT_PATH) -> None:
+    """
+    Solve the game and write the table to path
+    """
+    table = solve()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, VERSION, 2, len(LAYOUTS)))
+        output.write(table)
+    os.replace(tmp_path, path)
+
+
+_loaded: Dict[str, mmap.mmap] = {}
+
+
+def load_tablebase(path: str = DEFAULT_PATH) -> mmap.mmap:
+    """
+    Memory-map the table, building it first if the file is missing or outdated
+    """
+    table = _loaded.get(path)
+    if table is not None:
+        return table
+
+    if not _is_valid(path):
+        build_tablebase(path)
+    with open(path, "rb") as table_file:
+        table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+    _loaded[path] = table
+    return table
+
+
+def _is_valid(path: str) -> bool:
+    try:
+        with open(path, "rb") as table_file:
+            header = table_file.read(HEADER.size)
+            table_file.seek(0, os.SEEK_END)
+            size = table_file.tell()
+    except OSError:
+        return False
+    if len(header) != HEADER.size:
+        return False
+    return (HEADER.unpack(header) == (MAGIC, VERSION, 2, len(LAYOUTS))
+            and size == HEADER.size + len(LAYOUTS) * 2 * ENTRY_SIZE)
+
+
+def decode_value(value: int) -> Tuple[str, int]:
+    """
+    Convert a stored value to ('win' | 'loss' | 'draw' | 'over', distance in plies)
+    """
+    if value == TERMINAL:
+        return 'over', 0
+    if value == DRAW:
+        return 'draw', 0
+    if value >= LOSS:
+        return 'loss', value - LOSS
+    return 'win', value
+
+
+class ThreeMensMorrisTablebase:
+    def __init__(self, difficulty: str = 'hard', path: str = DEFAULT_PATH):
+        self.difficulty = difficulty
+        self.table = load_tablebase(path)
+
+    def probe(self, board: List[List[int]], player: int) -> Tuple[int, int]:
+        """
+        Read the (value, move) entry of a position, with the stored move of
+        the canonical layout mapped back onto the board
+        """
+        player1_mask, player2_mask, symmetry = canonical_masks(*board_to_masks(board))
+        index = entry_index(player1_mask, player2_mask, player)
+        if index is None:
+            raise ValueError("The tablebase only covers positions with 3 pieces per player")
+        offset = HEADER.size + index * ENTRY_SIZE
+        value, move = self.table[offset], self.table[offset + 1]
+        if move != NO_MOVE:
+            from_index, to_index = transform_move(divmod(move, BOARD_CELLS), INVERSES[symmetry])
+            move = from_index * BOARD_CELLS + to_index
+        return value, move
+
+    def evaluate(self, board: List[List[int]], player: int) -> Tuple[str, int]:
+        """
+        Game-theoretic value of the position for the player to move
+        Returns: ('win' | 'loss' | 'draw' | 'over', distance in plies)
+        """
+        return decode_value(self.probe(board, player)[0])
+
+    def get_best_move(self, board: List[List[int]], player: int,
+                      return_stats: bool = False) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """
+        Perfect move read from the table
+        Returns: ((from_row, from_col), (to_row, to_col)), None if there is no move,
+        or (move, SearchStats) with return_stats
+        """
+        started = time.perf_counter()
+        value, move = self.probe(board, player)
+        best_move = None
+        if move != NO_MOVE:
+            from_index, to_index = divmod(move, BOARD_CELLS)
+            best_move = CELL_POSITIONS[from_index], CELL_POSITIONS[to_index]
+        if not return_stats:
+            return best_move
+
+        stats = SearchStats('tablebase', self.difficulty)
+        stats.nodes = 1
+        # Plies to the end of the game under perfect play
+        stats.depth = decode_value(value)[1]
+        stats.elapsed = time.perf_counter() - started
+        return best_move, stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the moving-phase tablebase")
+    parser.add_argument("--output", default=DEFAULT_PATH, help="path of the table file")
+    args = parser.parse_args()
+
+    build_tablebase(args.output)
+    counts = {}
+    with open(args.output, "rb") as table_file:
+        data = table_file.read()[HEADER.size:]
+    for offset in range(0, len(data), ENTRY_SIZE):
+        kind = decode_value(data[offset])[0]
+        counts[kind] = counts.get(kind, 0) + 1
+    print(f"Wrote {args.output} ({HEADER.size + len(data)} bytes): "
+          + ", ".join(f"{kind} {count}" for kind, count in sorted(counts.items())))
@@ -0,0 +1,60 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from ai import ThreeMensMorrisAI
+from game_logic import get_mask_moves, get_mask_winner, masks_to_board
+
+
+def playable_positions():
+    """
+    Every 3 against 3 position with no winner where the side to move has a move,
+    as (board, player), in a fixed shuffled order
+    """
+    positions = []
+    for first_cells in combinations(range(9), 3):
+        others = [index for index in range(9) if index not in first_cells]
+        for second_cells in combinations(others, 3):
+            player1_mask = sum(1 << index for index in first_cells)
+            player2_mask = sum(1 << index for index in second_cells)
+            if get_mask_winner(player1_mask, player2_mask):
+                continue
+            for player in (1, 2):
+                own_mask = player1_mask if player == 1 else player2_mask
+                if get_mask_moves(own_mask, player1_mask | player2_mask):
+                    positions.append((masks_to_board(player1_mask, player2_mask), player))
+    random.Random(2).shuffle(positions)
+    return positions
+
+
+POSITIONS = playable_positions()
+
+
+@pytest.mark.parametrize("difficulty", ["medium", "hard"])
+def test_reused_engine_matches_fresh_engine(difficulty):
+    # The transposition table kept between moves must not change the moves played
+    reused = ThreeMensMorrisAI(difficulty)
+    for board, player in POSITIONS:
+        assert reused.get_best_move(board, player) == ThreeMensMorrisAI(difficulty).get_best_move(board, player), \
+            (board, player)
+
+
+def test_reused_worker_engines_match_fresh_engine():
+    # Worker engines keep their tables for the whole life of the pool
+    reused = ThreeMensMorrisAI('medium', workers=2)
+    try:
+        for board, player in POSITIONS[:400]:
+            assert reused.get_best_move(board, player) == ThreeMensMorrisAI('medium').get_best_move(board, player), \
+                (board, player)
+    finally:
+        reused.close()
+
+
+def test_blocking_root_move_stops_the_root_search():
+    # Moving (2,1) to (2,0) wins at once by leaving player 1 without a move
+    board = [[1, 1, 0], [1, 2, 0], [0, 2, 2]]
+    warm = ThreeMensMorrisAI('medium')
+    warm.get_best_move(*POSITIONS[0])
+    assert warm.get_best_move(board, 2) == ((2, 1), (2, 0))
+    assert ThreeMensMorrisAI('medium').get_best_move(board, 2) == ((2, 1), (2, 0))
@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai import ThreeMensMorrisAI
+from ai_astar import ThreeMensMorrisAStar
+from batch_eval import all_boards, lookup, score_table
+
+
+def board_lists(boards):
+    return [[list(map(int, row)) for row in board.reshape(3, 3)] for board in boards]
+
+
+@pytest.mark.parametrize("player", [1, 2])
+def test_evaluate_batch_matches_evaluate_position(player):
+    ai = ThreeMensMorrisAI()
+    boards = all_boards()
+    expected = [ai.evaluate_position(board, player) for board in board_lists(boards)]
+    assert ai.evaluate_batch(boards, player).tolist() == expected
+
+
+@pytest.mark.parametrize("player", [1, 2])
+def test_heuristic_batch_matches_heuristic(player):
+    engine = ThreeMensMorrisAStar()
+    boards = all_boards()
+    expected = [engine.heuristic(board, player) for board in board_lists(boards)]
+    assert engine.heuristic_batch(boards, player).tolist() == expected
+
+
+def test_lookup_rejects_players_and_cells_out_of_range():
+    table = score_table('zeros', lambda boards, player: np.zeros(len(boards)))
+    board = np.zeros((1, 9), dtype=np.int8)
+    for player in (0, 3, np.array([1, 0])):
+        with pytest.raises(ValueError):
+            lookup(table, np.zeros((len(np.atleast_1d(player)), 9), dtype=np.int8), player)
+    for cell in (-1, 3):
+        board[0, 4] = cell
+        with pytest.raises(ValueError):
+            lookup(table, board, 1)
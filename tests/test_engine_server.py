@@ -0,0 +1,32 @@
+import pytest
+
+from engine_server import validate_request
+
+
+def request(**fields):
+    return {'board': '111000222', 'player': 1, **fields}
+
+
+def test_defaults_are_filled_in():
+    checked = request()
+    validate_request(checked)
+    assert (checked['engine'], checked['difficulty']) == ('minimax', 'medium')
+
+
+@pytest.mark.parametrize("player", [True, False, 1.0, '1', 0, 3, None])
+def test_player_must_be_the_int_1_or_2(player):
+    with pytest.raises(ValueError):
+        validate_request(request(player=player))
+
+
+def test_expert_is_only_played_by_minimax():
+    validate_request(request(engine='minimax', difficulty='expert'))
+    for engine in ('astar', 'tablebase'):
+        with pytest.raises(ValueError):
+            validate_request(request(engine=engine, difficulty='expert'))
+
+
+@pytest.mark.parametrize("fields", [{'engine': 'random'}, {'difficulty': 'impossible'}])
+def test_unknown_engines_and_difficulties_are_rejected(fields):
+    with pytest.raises(ValueError):
+        validate_request(request(**fields))
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import engine_server
+import game_host
+from engine_server import Connection
+from game_host import GameHost
+
+
+@pytest.fixture
+def host(monkeypatch):
+    # AI turns on threads, so that choose_move can be replaced
+    monkeypatch.setattr(engine_server, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    host = GameHost(workers=1)
+    yield host
+    host.close()
+
+
+def request(host, connection, **fields):
+    """
+    Answer one request on connection, returning the decoded response
+    """
+    responses = []
+    connection.write_line = lambda text: responses.append(json.loads(text))
+    asyncio.run(host.answer(json.dumps(fields), connection))
+    return responses[0]
+
+
+def test_sessions_belong_to_their_connection(host):
+    owner, other = Connection(None), Connection(None)
+    session_id = request(host, owner, op='new')['session']
+    assert request(host, other, op='state', session=session_id)['error'] == f"unknown session {session_id}"
+    assert request(host, other, op='close', session=session_id)['error'] == f"unknown session {session_id}"
+    assert request(host, owner, op='state', session=session_id)['plies'] == 0
+
+
+def test_sessions_are_dropped_with_their_connection(host):
+    connection = Connection(None)
+    request(host, connection, op='new')
+
+    async def disconnect():
+        reader = asyncio.StreamReader()
+        reader.feed_eof()
+        await host.serve(reader, connection)
+    asyncio.run(disconnect())
+    assert connection.sessions == {}
+
+
+def test_a_failed_ai_reply_takes_the_move_back(host, monkeypatch):
+    connection = Connection(None)
+    session_id = request(host, connection, op='new', ai=2)['session']
+
+    def fail(*args):
+        raise RuntimeError("search crashed")
+    monkeypatch.setattr(game_host, 'choose_move', fail)
+    assert 'error' in request(host, connection, op='move', session=session_id, to=4)
+    session = connection.sessions[session_id]
+    assert (session.history.plies, session.history.can_redo()) == (0, False)
+    assert not session.thinking
+
+
+def test_a_failed_first_ai_move_leaves_no_session(host, monkeypatch):
+    connection = Connection(None)
+
+    def fail(*args):
+        raise RuntimeError("search crashed")
+    monkeypatch.setattr(game_host, 'choose_move', fail)
+    assert 'error' in request(host, connection, op='new', ai=1)
+    assert connection.sessions == {}
@@ -0,0 +1,65 @@
+import gc
+import os
+import warnings
+
+import pytest
+
+from engine_core import FIXED_START_RULES, PLACE_AND_MOVE_RULES
+from game_record import FILE_HEADER, RECORD_ENV, GameRecord, GameRecordWriter, append_game, read_games, record_path
+from game_state import DRAW
+
+
+def sample_records():
+    return [
+        GameRecord(FIXED_START_RULES, FIXED_START_RULES.start_state(), [(0, 3), (8, 5), (3, 0), (5, 8)], DRAW),
+        GameRecord(PLACE_AND_MOVE_RULES, PLACE_AND_MOVE_RULES.start_state(),
+                   [(None, 0), (None, 3), (None, 1), (None, 4), (None, 2)], 1, ('human', 'core/hard')),
+        GameRecord(FIXED_START_RULES, FIXED_START_RULES.start_state(), [], None),
+    ]
+
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / "games.tmmr")
+    with GameRecordWriter(path) as writer:
+        for record in sample_records()[:2]:
+            writer.write(record)
+    append_game(sample_records()[2], path)
+
+    games = list(read_games(path))
+    assert len(games) == 3
+    for game, record in zip(games, sample_records()):
+        assert (game.rules, game.start, list(game.moves), game.result, game.engines) == \
+               (record.rules, record.start, list(record.moves), record.result, record.engines)
+    assert list(games[1].states())[-1].winner == 1
+
+
+@pytest.mark.parametrize("content", [b"not a record file", b"TM", b"TMMR\x63"])
+def test_writer_refuses_foreign_file_without_leaking_it(tmp_path, content):
+    path = tmp_path / "games.tmmr"
+    path.write_bytes(content)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with pytest.raises(ValueError):
+            GameRecordWriter(str(path))
+        gc.collect()
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
+    assert path.read_bytes() == content
+
+
+def test_reader_rejects_truncated_file(tmp_path):
+    path = tmp_path / "games.tmmr"
+    append_game(sample_records()[0], str(path))
+    data = path.read_bytes()
+    for size in (FILE_HEADER.size - 1, FILE_HEADER.size + 3, len(data) - 1):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            list(read_games(str(path)))
+
+
+def test_recording_is_opt_in(monkeypatch):
+    monkeypatch.delenv(RECORD_ENV, raising=False)
+    assert record_path() is None
+    monkeypatch.setenv(RECORD_ENV, "")
+    assert record_path() is None
+    monkeypatch.setenv(RECORD_ENV, "~/games.tmmr")
+    assert record_path() == os.path.join(os.path.expanduser("~"), "games.tmmr")
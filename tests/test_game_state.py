@@ -0,0 +1,84 @@
+import copy
+import pickle
+
+import pytest
+
+from engine_core import FIXED_START_RULES
+from game_state import DRAW, PLACING, GameHistory, GameState
+
+# Both players step forward and back: the start position recurs every 4 plies
+SHUFFLE = [(0, 3), (8, 5), (3, 0), (5, 8)]
+
+
+def test_board_round_trip():
+    board = [[1, 0, 2], [0, 1, 0], [2, 0, 0]]
+    state = GameState.from_board(board, 2)
+    assert state.to_board() == board
+    assert state.cells() == '102010200'
+    assert state.masks() == (0b000010001, 0b001000100)
+    assert state.own_masks() == (0b001000100, 0b000010001)
+
+
+def test_states_are_immutable_and_shared_by_copies():
+    state = GameState.from_masks(0b111, 0b111 << 6, 1)
+    with pytest.raises(AttributeError):
+        state.side = 2
+    with pytest.raises(AttributeError):
+        del state.board
+    assert copy.copy(state) is state and copy.deepcopy(state) is state
+    assert pickle.loads(pickle.dumps(state)) == state
+
+
+def test_position_key_ignores_the_result_and_phase_changes_equality():
+    state = GameState.from_masks(0b111, 0b111 << 6, 1)
+    assert state.drawn().winner == DRAW
+    assert state.drawn().position_key == state.position_key
+    assert state.drawn() != state
+    assert GameState(state.board, 2).position_key != state.position_key
+    assert GameState(state.board, 1, PLACING) != state
+    assert hash(GameState(state.board, 1)) == hash(state)
+
+
+def play(history, moves):
+    for move in moves:
+        history.push(FIXED_START_RULES.play_state(history.current, move))
+
+
+def test_undo_and_redo_round_trip():
+    history = GameHistory(FIXED_START_RULES.start_state())
+    play(history, SHUFFLE[:3])
+    played = list(history.states)
+    assert history.undo() == played[2] and history.undo() == played[1]
+    assert history.plies == 1 and history.can_redo()
+    assert history.redo() == played[2] and history.redo() == played[3]
+    assert history.states == played and not history.can_redo()
+    assert history.redo() is None
+
+    while history.can_undo():
+        history.undo()
+    assert history.current == played[0] and history.undo() is None
+
+
+def test_a_new_move_discards_the_redo_states():
+    history = GameHistory(FIXED_START_RULES.start_state())
+    play(history, SHUFFLE[:2])
+    history.undo()
+    play(history, [(7, 4)])
+    assert not history.can_redo() and history.redo() is None
+    assert history.current.cells() == '011120202'
+
+
+def test_third_occurrence_draws_until_undone():
+    history = GameHistory(FIXED_START_RULES.start_state())
+    play(history, SHUFFLE)
+    assert history.current.winner is None and history.repetitions(history.current) == 2
+    play(history, SHUFFLE)
+    assert history.plies == 8 and history.current.winner == DRAW
+    assert history.repetitions(history.current) == 3
+
+    in_progress = history.undo()
+    assert history.plies == 7 and in_progress.winner is None
+    assert history.repetitions(history.states[0]) == 2
+
+    assert history.redo().winner == DRAW
+    assert history.repetitions(history.current) == 3
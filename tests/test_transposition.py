@@ -0,0 +1,12 @@
+from transposition import EXACT, TranspositionTable
+
+
+def test_clear_restarts_statistics():
+    table = TranspositionTable(2)
+    table.probe(1)
+    for key in (1, 2, 3):
+        table.store(key, 1, 0.0, EXACT, None)
+    table.probe(3)
+    table.clear()
+    assert len(table) == 0
+    assert table.stats() == {'entries': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'stores': 0, 'evictions': 0}
@@ -0,0 +1,103 @@
+"""
+Zobrist hashing and a bounded transposition table for the minimax search.
+"""
+import random
+from typing import Optional, Tuple
+
+from game_logic import BOARD_CELLS, MASK_CELLS
+from symmetry import CELL_PERMUTATIONS, MIRROR
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Fixed seed so that keys are stable from one run to the next
+_rng = random.Random(0x3D0C)
+
+# ZOBRIST_KEYS[player][cell] for players 1 and 2 (index 0 is unused)
+ZOBRIST_KEYS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_rng.getrandbits(64) for _ in range(BOARD_CELLS)) for _ in range(3)
+)
+# Keys of the mirrored cells: hashing a position with them gives the key of
+# its mirror image, so both can be updated incrementally
+MIRROR_ZOBRIST_KEYS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(keys[index] for index in CELL_PERMUTATIONS[MIRROR]) for keys in ZOBRIST_KEYS
+)
+# Toggled when the maximizing side is to move
+SIDE_KEY = _rng.getrandbits(64)
+# Scores are relative to the searching player, so keep both perspectives apart
+PERSPECTIVE_KEYS = (0, _rng.getrandbits(64), _rng.getrandbits(64))
+
+
+class TranspositionTable:
+    """
+    Search results keyed by Zobrist hash. Each entry stores
+    (depth, value, bound type, best move). When the table is full the
+    oldest stored entry is evicted; storing a position again refreshes it.
+    """
+
+    def __init__(self, max_entries: int = 1 << 16):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def probe(self, key: int) -> Optional[Tuple[int, float, int, object]]:
+        """
+        Get the (depth, value, bound type, best move) entry of a position
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key: int, depth: int, value: float, bound: int, best_move) -> None:
+        entries = self.entries
+        if key in entries:
+            del entries[key]
+        elif len(entries) >= self.max_entries:
+            del entries[next(iter(entries))]
+            self.evictions += 1
+        entries[key] = (depth, value, bound, best_move)
+        self.stores += 1
+
+    def clear(self) -> None:
+        """
+        Drop every entry and restart the statistics
+        """
+        self.entries.clear()
+        self.hits = self.misses = self.stores = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+
+def zobrist_key_masks(player1_mask: int, player2_mask: int, player: int, maximizing_player: bool) -> int:
+    """
+    Hash of a position given as bitboards, searched from the given player's point of view
+    """
+    key = PERSPECTIVE_KEYS[player]
+    if maximizing_player:
+        key ^= SIDE_KEY
+    for index in MASK_CELLS[player1_mask]:
+        key ^= ZOBRIST_KEYS[1][index]
+    for index in MASK_CELLS[player2_mask]:
+        key ^= ZOBRIST_KEYS[2][index]
+    return key